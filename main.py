@@ -6,19 +6,14 @@ import sys
 sys.path.append('src')
 sys.path.append('strategies')
 
-from data_fetcher import StockDataFetcher
-from technical_analysis import TechnicalIndicators
-from dual_ma_strategy import DualMovingAverageStrategy
-from macd_strategy import MACDStrategy
-from kdj_strategy import KDJStrategy
-from advanced_screener import AdvancedStockScreener
-from similar_stocks import SimilarStockFinder
-import pandas as pd
+# 数据获取、策略等模块依赖 akshare/pandas，导入较慢，在各示例函数内按需导入
 from datetime import datetime, timedelta
 
 
 def example_1_get_stock_data():
     """示例1: 获取股票数据"""
+    from src.data_fetcher import StockDataFetcher
+    
     print("=" * 50)
     print("示例1: 获取股票数据")
     print("=" * 50)
@@ -46,12 +41,16 @@ def example_1_get_stock_data():
 
 def example_2_technical_analysis(df):
     """示例2: 技术指标分析"""
+    from src.technical_analysis import TechnicalIndicators
+    
     print("\n" + "=" * 50)
     print("示例2: 技术指标分析")
     print("=" * 50)
     
-    # 计算所有技术指标
-    df_with_indicators = TechnicalIndicators.calculate_all_indicators(df)
+    # 只计算需要展示的指标(金叉/死叉只依赖MA5/MA20)
+    df_with_indicators = TechnicalIndicators.calculate_all_indicators(
+        df, indicators=('MA', 'MACD', 'RSI', 'KDJ')
+    )
     
     # 显示最近的数据和指标
     print("\n最近5天的技术指标:")
@@ -77,75 +76,82 @@ def example_2_technical_analysis(df):
     return df_with_indicators
 
 
+def _print_backtest_summary(title: str, result: dict, recent_trades: int = 0):
+    """
+    打印单个策略的回测结果
+    
+    Args:
+        title: 策略标题
+        result: 策略 backtest() 返回的结果字典
+        recent_trades: 额外列出的最近交易笔数，0 表示不列出
+    """
+    trade_log = result['trade_log']
+    lines = [
+        f"\n{title}",
+        "-" * 40,
+        f"初始资金: ¥{result['initial_capital']:,.2f}",
+        f"最终资金: ¥{result['final_value']:,.2f}",
+        f"总收益率: {result['total_return']:.2f}%",
+        f"交易次数: {len(trade_log)}",
+    ]
+    
+    if recent_trades and trade_log:
+        lines.append(f"\n最近{recent_trades}次交易:")
+        lines.extend(
+            f"  {trade['date']:%Y-%m-%d} - {trade['action']} @ ¥{trade['price']:.2f}"
+            for trade in trade_log[-recent_trades:]
+        )
+    
+    print("\n".join(lines))
+
+
 def example_3_backtest_strategies(df):
     """示例3: 策略回测"""
+    from dual_ma_strategy import DualMovingAverageStrategy
+    from macd_strategy import MACDStrategy
+    from kdj_strategy import KDJStrategy
+    
     print("\n" + "=" * 50)
     print("示例3: 量化策略回测")
     print("=" * 50)
     
     initial_capital = 100000
     
-    # 1. 双均线策略
-    print("\n1. 双均线策略 (MA5 & MA20)")
-    print("-" * 40)
-    dual_ma = DualMovingAverageStrategy(short_period=5, long_period=20)
-    result1 = dual_ma.backtest(df, initial_capital)
-    
-    print(f"初始资金: ¥{result1['initial_capital']:,.2f}")
-    print(f"最终资金: ¥{result1['final_value']:,.2f}")
-    print(f"总收益率: {result1['total_return']:.2f}%")
-    print(f"交易次数: {len(result1['trade_log'])}")
+    # 每个回测只有几百行数据、耗时毫秒级，直接在当前进程依次执行
+    result1 = DualMovingAverageStrategy(short_period=5, long_period=20).backtest(df, initial_capital)
+    result2 = MACDStrategy().backtest(df, initial_capital)
+    result3 = KDJStrategy().backtest(df, initial_capital)
     
-    if len(result1['trade_log']) > 0:
-        print("\n最近3次交易:")
-        for trade in result1['trade_log'][-3:]:
-            print(f"  {trade['date'].strftime('%Y-%m-%d')} - {trade['action']} @ ¥{trade['price']:.2f}")
-    
-    # 2. MACD策略
-    print("\n2. MACD策略")
-    print("-" * 40)
-    macd = MACDStrategy()
-    result2 = macd.backtest(df, initial_capital)
-    
-    print(f"初始资金: ¥{result2['initial_capital']:,.2f}")
-    print(f"最终资金: ¥{result2['final_value']:,.2f}")
-    print(f"总收益率: {result2['total_return']:.2f}%")
-    print(f"交易次数: {len(result2['trade_log'])}")
-    
-    # 3. KDJ策略
-    print("\n3. KDJ策略")
-    print("-" * 40)
-    kdj = KDJStrategy()
-    result3 = kdj.backtest(df, initial_capital)
-    
-    print(f"初始资金: ¥{result3['initial_capital']:,.2f}")
-    print(f"最终资金: ¥{result3['final_value']:,.2f}")
-    print(f"总收益率: {result3['total_return']:.2f}%")
-    print(f"交易次数: {len(result3['trade_log'])}")
+    _print_backtest_summary("1. 双均线策略 (MA5 & MA20)", result1, recent_trades=3)
+    _print_backtest_summary("2. MACD策略", result2)
+    _print_backtest_summary("3. KDJ策略", result3)
     
     # 策略对比
     print("\n" + "=" * 50)
     print("策略收益对比:")
     print("-" * 40)
-    strategies_comparison = pd.DataFrame({
-        '策略': ['双均线', 'MACD', 'KDJ'],
-        '收益率(%)': [
-            result1['total_return'],
-            result2['total_return'],
-            result3['total_return']
-        ],
-        '交易次数': [
-            len(result1['trade_log']),
-            len(result2['trade_log']),
-            len(result3['trade_log'])
-        ]
-    })
-    strategies_comparison = strategies_comparison.sort_values('收益率(%)', ascending=False)
-    print(strategies_comparison.to_string(index=False))
+    rows = sorted([
+        ('双均线', result1['total_return'], len(result1['trade_log'])),
+        ('MACD', result2['total_return'], len(result2['trade_log'])),
+        ('KDJ', result3['total_return'], len(result3['trade_log'])),
+    ], key=lambda row: -row[1])
+    print(f"{'策略':<8}{'收益率(%)':>12}{'交易次数':>10}")
+    for name, total_return, trade_count in rows:
+        print(f"{name:<8}{total_return:>12.2f}{trade_count:>10}")
 
 
-def example_4_stock_screener():
-    """示例4: 股票筛选器"""
+def example_4_stock_screener(max_workers: int = 10):
+    """
+    示例4: 股票筛选器
+    
+    Args:
+        max_workers: 并行获取历史数据的线程数
+    """
+    import pandas as pd
+    from src.data_fetcher import StockDataFetcher, get_stock_list_cached
+    from src.technical_analysis import TechnicalIndicators
+    from src.ma_state import recent_closes, closes_from_frames, save_state
+    
     print("\n" + "=" * 50)
     print("示例4: 股票筛选 - 寻找金叉机会")
     print("=" * 50)
@@ -154,7 +160,7 @@ def example_4_stock_screener():
     
     # 获取部分股票列表(示例只取前20只)
     print("\n正在获取股票列表...")
-    stock_list = fetcher.get_stock_list()
+    stock_list = get_stock_list_cached()
     
     if stock_list.empty:
         print("无法获取股票列表")
@@ -163,42 +169,56 @@ def example_4_stock_screener():
     # 只分析前10只股票作为演示
     sample_stocks = stock_list.head(10)
     
-    golden_cross_stocks = []
-    
-    end_date = datetime.now().strftime("%Y%m%d")
-    start_date = (datetime.now() - timedelta(days=60)).strftime("%Y%m%d")
+    # 当前时间和日期区间只计算一次
+    now = datetime.now()
+    end_date = now.strftime("%Y%m%d")
+    start_date = (now - timedelta(days=60)).strftime("%Y%m%d")
     
     print(f"\n正在分析 {len(sample_stocks)} 只股票...")
     
-    for idx, row in sample_stocks.iterrows():
-        symbol = row['代码']
-        name = row['名称']
+    # 优先使用本地收盘价状态 + 实时快照，状态缺失或过期时再逐只获取历史数据
+    big = recent_closes(sample_stocks, now)
+    if big is None:
+        # 批量并发获取历史数据(异步连接池，未安装 aiohttp 时使用线程池)
+        frames = fetcher.get_stock_hist_many(
+            sample_stocks['代码'].tolist(), start_date, end_date, max_workers=max_workers
+        )
         
-        try:
-            df = fetcher.get_stock_hist(symbol, start_date, end_date)
-            if df.empty or len(df) < 20:
-                continue
-            
-            # 计算均线
-            df = TechnicalIndicators.calculate_ma(df, periods=[5, 20])
-            
-            # 检查最近是否有金叉
-            df = TechnicalIndicators.find_golden_cross(df)
-            recent_golden_cross = df[df['Golden_Cross'] == True].tail(1)
-            
-            if not recent_golden_cross.empty:
-                days_ago = (datetime.now() - recent_golden_cross['日期'].iloc[0]).days
-                if days_ago <= 5:  # 5天内的金叉
-                    golden_cross_stocks.append({
-                        '代码': symbol,
-                        '名称': name,
-                        '金叉日期': recent_golden_cross['日期'].iloc[0],
-                        '当前价': row['最新价'],
-                        '涨跌幅': row['涨跌幅']
-                    })
-            
-        except Exception as e:
-            continue
+        # 合并为长表，顺便刷新本地状态供下次使用
+        big = closes_from_frames(frames)
+        if not big.empty:
+            save_state(big)
+    
+    # 数据不足20天的股票无法计算MA20
+    big = big[big.groupby('symbol', sort=False)['收盘'].transform('size') >= 20]
+    # 金叉只检查最近 lookback 个交易日，用到最近 lookback+1 天的均线，
+    # 每只股票只需保留计算这些均线的最近 lookback+20 行
+    lookback = 10
+    big = big.groupby('symbol', sort=False).tail(lookback + 20).reset_index(drop=True)
+    
+    golden_cross_stocks = []
+    if not big.empty:
+        # 一次分组滚动计算所有股票的均线
+        grouped = big.groupby('symbol', sort=False)
+        big['MA5'] = grouped['收盘'].rolling(5).mean().droplevel(0)
+        big['MA20'] = grouped['收盘'].rolling(20).mean().droplevel(0)
+        
+        # 金叉: 同一只股票内MA5上穿MA20，只需检查最近 lookback 个交易日
+        recent = TechnicalIndicators.find_recent_golden_cross(big, lookback=lookback, group_col='symbol')
+        
+        # 每只股票最近一次金叉，且在5天内
+        last_cross = recent[recent['Golden_Cross']].groupby('symbol', sort=False).tail(1)
+        last_cross = last_cross[(now - last_cross['日期']).dt.days <= 5]
+        
+        info = sample_stocks.set_index('代码')
+        for symbol, cross_date in zip(last_cross['symbol'], last_cross['日期']):
+            golden_cross_stocks.append({
+                '代码': symbol,
+                '名称': info.at[symbol, '名称'],
+                '金叉日期': cross_date,
+                '当前价': info.at[symbol, '最新价'],
+                '涨跌幅': info.at[symbol, '涨跌幅']
+            })
     
     if golden_cross_stocks:
         print(f"\n发现 {len(golden_cross_stocks)} 只近期金叉股票:")
@@ -209,6 +229,8 @@ def example_4_stock_screener():
 
 def example_5_advanced_screener():
     """示例5: 高级股票筛选"""
+    from src.advanced_screener import AdvancedStockScreener
+    
     print("\n" + "=" * 50)
     print("示例5: 高级多条件筛选")
     print("=" * 50)
@@ -251,6 +273,8 @@ def example_5_advanced_screener():
 
 def example_6_similar_stocks():
     """示例6: 相似股票推荐"""
+    from src.similar_stocks import SimilarStockFinder
+    
     print("\n" + "=" * 50)
     print("示例6: 相似股票推荐")
     print("=" * 50)
@@ -349,8 +373,6 @@ def main():
         example_4_stock_screener()
         example_5_advanced_screener()
         example_6_similar_stocks()
-        example_4_stock_screener()
-        example_5_advanced_screener()
 
 
 if __name__ == "__main__":
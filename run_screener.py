@@ -6,8 +6,13 @@ import sys
 sys.path.append('src')
 
 from advanced_screener import run_custom_screen
+from cli_args import make_screener_parser
+from log_config import setup_logging
 
 if __name__ == "__main__":
+    args = make_screener_parser().parse_args()
+    setup_logging(args.verbose)
+    
     print("""
     ╔═══════════════════════════════════════════════╗
     ║      A股高级筛选器                            ║
@@ -26,4 +31,4 @@ if __name__ == "__main__":
     开始筛选...
     """)
     
-    run_custom_screen()
+    run_custom_screen(force=args.force, max_workers=args.workers)
@@ -9,29 +9,73 @@
     python run_stock_query.py 000001 --detail     # 详细信息
     python run_stock_query.py 000001 --all        # 全部信息
 """
-import sys
-import argparse
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
-sys.path.append('src')
-from data_fetcher import StockDataFetcher
-from technical_analysis import TechnicalIndicators
+from src.data_fetcher import StockDataFetcher, get_stock_list_cached
+from src.technical_analysis import TechnicalIndicators
+from src.cli_args import make_query_parser
+from src.log_config import setup_logging
 
 
 class StockQuery:
     """股票信息查询器"""
     
+    # 实时行情展示字段: (标签, 字段名, 格式)
+    QUOTE_FIELDS = [
+        ('最新价: ', '最新价', '{:.2f}'),
+        ('涨跌幅: ', '涨跌幅', '{:.2f}%'),
+        ('今开:   ', '今开', '{:.2f}'),
+        ('最高:   ', '最高', '{:.2f}'),
+        ('最低:   ', '最低', '{:.2f}'),
+    ]
+    TRADE_FIELDS = [
+        ('换手率: ', '换手率', '{:.2f}%'),
+        ('量比:   ', '量比', '{:.2f}'),
+        ('振幅:   ', '振幅', '{:.2f}%'),
+    ]
+    VALUATION_FIELDS = [
+        ('市盈率:   ', '市盈率-动态', '{:.2f}'),
+    ]
+    
     def __init__(self):
         self.fetcher = StockDataFetcher()
         self._stock_list_cache = None
+        # 搜索索引，在首次获取股票列表时构建
+        self._codes_sorted = None
+        self._code_order = None
+        self._names = None
+        self._search_text = None
+        # 历史数据+指标的内存缓存: (代码, 天数, 日期) -> DataFrame
+        self._history_cache = {}
+        self._history_cache_size = 128
     
     def _get_stock_list(self) -> pd.DataFrame:
         """获取并缓存股票列表"""
         if self._stock_list_cache is None:
-            self._stock_list_cache = self.fetcher.get_stock_list()
+            self._stock_list_cache = get_stock_list_cached()
+            self._build_search_index(self._stock_list_cache)
         return self._stock_list_cache
     
+    def _build_search_index(self, stock_list: pd.DataFrame):
+        """
+        构建搜索索引，交互查询时复用
+        
+        - 排序后的代码数组: 精确匹配代码走二分查找
+        - 名称+代码拼接的小写文本: 模糊匹配只需扫描一次
+        """
+        if stock_list.empty:
+            return
+        
+        codes = stock_list['代码'].astype(str).to_numpy()
+        self._code_order = np.argsort(codes, kind='stable')
+        self._codes_sorted = codes[self._code_order]
+        self._names = stock_list['名称'].to_numpy()
+        self._search_text = (
+            stock_list['名称'].fillna('').astype(str) + '|' + stock_list['代码'].astype(str)
+        ).str.lower()
+    
     def search_stock(self, keyword: str) -> pd.DataFrame:
         """
         搜索股票（支持代码或名称）
@@ -47,24 +91,19 @@ class StockQuery:
         if stock_list.empty:
             return pd.DataFrame()
         
-        # 精确匹配代码
-        exact_code = stock_list[stock_list['代码'] == keyword]
-        if not exact_code.empty:
-            return exact_code
+        # 精确匹配代码（二分查找）
+        pos = np.searchsorted(self._codes_sorted, keyword)
+        if pos < len(self._codes_sorted) and self._codes_sorted[pos] == keyword:
+            return stock_list.iloc[[self._code_order[pos]]]
         
         # 精确匹配名称
-        exact_name = stock_list[stock_list['名称'] == keyword]
+        exact_name = stock_list[self._names == keyword]
         if not exact_name.empty:
             return exact_name
         
-        # 模糊匹配名称
-        fuzzy_name = stock_list[stock_list['名称'].str.contains(keyword, na=False)]
-        if not fuzzy_name.empty:
-            return fuzzy_name
-        
-        # 模糊匹配代码
-        fuzzy_code = stock_list[stock_list['代码'].str.contains(keyword, na=False)]
-        return fuzzy_code
+        # 模糊匹配名称或代码（单次扫描，不使用正则）
+        fuzzy = self._search_text.str.contains(keyword.lower(), regex=False)
+        return stock_list[fuzzy.to_numpy()]
     
     def resolve_symbol(self, keyword: str) -> tuple:
         """
@@ -88,9 +127,9 @@ class StockQuery:
         # 多个结果，让用户选择
         print(f"\n找到 {len(results)} 个匹配结果:")
         print("-" * 50)
-        for idx, (_, row) in enumerate(results.head(10).iterrows(), 1):
-            print(f"  {idx}. {row['代码']} {row['名称']} "
-                  f"现价:{row.get('最新价', '-')} 涨跌:{row.get('涨跌幅', '-'):.2f}%")
+        for idx, row in enumerate(results.head(10).itertuples(index=False), 1):
+            print(f"  {idx}. {row.代码} {row.名称} "
+                  f"现价:{getattr(row, '最新价', '-')} 涨跌:{getattr(row, '涨跌幅', '-'):.2f}%")
         
         if len(results) > 10:
             print(f"  ... 还有 {len(results) - 10} 个结果")
@@ -206,6 +245,41 @@ class StockQuery:
         
         return df
     
+    def get_history_with_indicators(self, symbol: str, days: int = 60) -> pd.DataFrame:
+        """
+        获取历史数据并计算技术指标（同一交易日内重复查询直接返回缓存）
+        
+        Args:
+            symbol: 股票代码
+            days: 获取天数
+            
+        Returns:
+            DataFrame: 带技术指标的历史数据
+        """
+        key = (symbol, days, datetime.now().strftime("%Y%m%d"))
+        if key in self._history_cache:
+            return self._history_cache[key]
+        
+        df = self.calculate_indicators(self.get_history_data(symbol, days))
+        if not df.empty:
+            # 超出容量时淘汰最早写入的条目
+            if len(self._history_cache) >= self._history_cache_size:
+                self._history_cache.pop(next(iter(self._history_cache)))
+            self._history_cache[key] = df
+        return df
+    
+    @staticmethod
+    def _format_value(value, fmt: str) -> str:
+        """按格式输出数值，缺失或非数值时输出 '-'"""
+        if isinstance(value, (int, float, np.number)) and pd.notna(value):
+            return fmt.format(value)
+        return '-'
+    
+    def _print_fields(self, data: dict, fields: list):
+        """按 (标签, 字段名, 格式) 列表逐行打印"""
+        for label, key, fmt in fields:
+            print(f"  {label}{self._format_value(data.get(key), fmt)}")
+    
     def print_realtime(self, data: dict):
         """打印实时行情"""
         if not data:
@@ -217,20 +291,14 @@ class StockQuery:
         
         # 基本行情
         print(f"\n【实时行情】")
-        print(f"  最新价: {data.get('最新价', '-')}")
-        print(f"  涨跌幅: {data.get('涨跌幅', '-'):.2f}%" if isinstance(data.get('涨跌幅'), (int, float)) else f"  涨跌幅: -")
-        print(f"  今开:   {data.get('今开', '-')}")
-        print(f"  最高:   {data.get('最高', '-')}")
-        print(f"  最低:   {data.get('最低', '-')}")
+        self._print_fields(data, self.QUOTE_FIELDS)
         
         # 成交数据
         print(f"\n【成交数据】")
         volume = data.get('成交量', 0)
         if volume:
             print(f"  成交量: {volume/10000:.2f} 万手" if volume > 10000 else f"  成交量: {volume:.0f} 手")
-        print(f"  换手率: {data.get('换手率', '-'):.2f}%" if isinstance(data.get('换手率'), (int, float)) else f"  换手率: -")
-        print(f"  量比:   {data.get('量比', '-'):.2f}" if isinstance(data.get('量比'), (int, float)) else f"  量比: -")
-        print(f"  振幅:   {data.get('振幅', '-'):.2f}%" if isinstance(data.get('振幅'), (int, float)) else f"  振幅: -")
+        self._print_fields(data, self.TRADE_FIELDS)
         
         # 市值数据
         print(f"\n【市值数据】")
@@ -240,7 +308,7 @@ class StockQuery:
             print(f"  总市值:   {total_mv/1e8:.2f} 亿")
         if float_mv:
             print(f"  流通市值: {float_mv/1e8:.2f} 亿")
-        print(f"  市盈率:   {data.get('市盈率-动态', '-'):.2f}" if isinstance(data.get('市盈率-动态'), (int, float)) else f"  市盈率: -")
+        self._print_fields(data, self.VALUATION_FIELDS)
         
         print("=" * 60)
     
@@ -267,11 +335,6 @@ class StockQuery:
         print("📈 历史K线数据")
         print("=" * 80)
         
-        # 设置显示选项
-        pd.set_option('display.max_columns', None)
-        pd.set_option('display.width', None)
-        pd.set_option('display.unicode.east_asian_width', True)
-        
         # 选择显示的列
         if show_indicators:
             display_cols = ['日期', '开盘', '收盘', '最高', '最低', '成交量', 
@@ -282,11 +345,15 @@ class StockQuery:
         # 只选择存在的列
         display_cols = [c for c in display_cols if c in df.columns]
         
-        # 格式化
-        display_df = df[display_cols].copy()
-        display_df['日期'] = display_df['日期'].dt.strftime('%Y-%m-%d')
+        # 先截取最近20条再格式化，避免复制和格式化整段数据
+        display_df = df[display_cols].tail(20)
+        display_df = display_df.assign(日期=display_df['日期'].dt.strftime('%Y-%m-%d'))
         
-        print(display_df.tail(20).to_string(index=False))
+        # 显示选项只在本次输出内生效，不修改全局设置
+        with pd.option_context('display.max_columns', None,
+                               'display.width', None,
+                               'display.unicode.east_asian_width', True):
+            print(display_df.to_string(index=False))
         
         # 统计信息
         print("\n" + "-" * 80)
@@ -295,8 +362,9 @@ class StockQuery:
         print(f"平均成交量: {df['成交量'].mean():.0f} 手")
         
         if '涨跌幅' in df.columns:
-            up_days = (df['涨跌幅'] > 0).sum()
-            down_days = (df['涨跌幅'] < 0).sum()
+            changes = df['涨跌幅'].to_numpy()
+            up_days = int((changes > 0).sum())
+            down_days = int((changes < 0).sum())
             print(f"上涨天数: {up_days}  下跌天数: {down_days}")
         
         print("=" * 80)
@@ -317,12 +385,13 @@ class StockQuery:
         print("\n【均线系统】")
         price = latest['收盘']
         
-        for ma in ['MA5', 'MA10', 'MA20', 'MA60']:
-            if ma in latest and pd.notna(latest[ma]):
-                ma_value = latest[ma]
-                diff = (price - ma_value) / ma_value * 100
-                status = "↑" if price > ma_value else "↓"
-                print(f"  {ma}: {ma_value:.2f} ({status} {abs(diff):.1f}%)")
+        # 一次取出所有有效均线值，统一计算偏离度
+        ma_cols = [ma for ma in ['MA5', 'MA10', 'MA20', 'MA60'] if ma in latest]
+        ma_values = latest[ma_cols].dropna().astype(float)
+        diffs = (price - ma_values) / ma_values * 100
+        for ma, ma_value, diff in zip(ma_values.index, ma_values, diffs):
+            status = "↑" if price > ma_value else "↓"
+            print(f"  {ma}: {ma_value:.2f} ({status} {abs(diff):.1f}%)")
         
         # 均线排列判断
         if all(ma in latest for ma in ['MA5', 'MA10', 'MA20']):
@@ -434,12 +503,9 @@ class StockQuery:
         
         # 3. 历史数据
         if show_hist or show_indicators:
-            hist = self.get_history_data(symbol, days)
+            hist = self.get_history_with_indicators(symbol, days)
             
             if not hist.empty:
-                # 计算技术指标
-                hist = self.calculate_indicators(hist)
-                
                 # 打印历史数据
                 self.print_history(hist, show_indicators)
                 
@@ -449,29 +515,8 @@ class StockQuery:
 
 
 def main():
-    parser = argparse.ArgumentParser(
-        description='股票信息查询工具 (支持代码或名称搜索)',
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-示例:
-  python run_stock_query.py 000001              # 用代码查询平安银行
-  python run_stock_query.py 平安银行            # 用名称查询
-  python run_stock_query.py 茅台                # 模糊搜索
-  python run_stock_query.py 中国长城 --hist     # 查询历史K线
-  python run_stock_query.py 宁德时代 --tech     # 查询技术指标
-  python run_stock_query.py 比亚迪 --all        # 查询全部信息
-  python run_stock_query.py 银行                # 搜索包含"银行"的股票
-        """
-    )
-    
-    parser.add_argument('keyword', type=str, help='股票代码或名称 (支持模糊搜索)')
-    parser.add_argument('--hist', '-H', action='store_true', help='显示历史K线')
-    parser.add_argument('--days', '-d', type=int, default=60, help='历史数据天数 (默认60)')
-    parser.add_argument('--detail', '-D', action='store_true', help='显示公司详细信息')
-    parser.add_argument('--tech', '-t', action='store_true', help='显示技术指标分析')
-    parser.add_argument('--all', '-a', action='store_true', help='显示全部信息')
-    
-    args = parser.parse_args()
+    args = make_query_parser().parse_args()
+    setup_logging(args.verbose)
     
     # 处理输入（去除可能的前缀）
     keyword = args.keyword.strip()
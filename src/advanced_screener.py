@@ -4,11 +4,13 @@
 """
 import pandas as pd
 import numpy as np
+from collections import Counter
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
-import time
-from src.data_fetcher import StockDataFetcher
+from src.cache import FileCache
+from src.data_fetcher import StockDataFetcher, get_stock_list_cached, seconds_until_next_session
 from src.technical_analysis import TechnicalIndicators
+from src.ta_kernels import screen_kernel
 
 
 class AdvancedStockScreener:
@@ -17,6 +19,9 @@ class AdvancedStockScreener:
     def __init__(self):
         self.fetcher = StockDataFetcher()
         self.results = []
+        # 收盘后的筛选结果按参数缓存到下一个交易时段开始，期间重复筛选直接复用；
+        # 盘中涨幅、换手率实时变化，不缓存
+        self._results_cache = FileCache('screen')
     
     def screen_stocks(self,
                      min_price_to_ma120_ratio: float = 0.95,
@@ -30,7 +35,9 @@ class AdvancedStockScreener:
                      max_turnover: float = 10.0,
                      exclude_kcb: bool = True,  # 排除科创板
                      exclude_st: bool = True,  # 排除ST
-                     max_stocks: int = 50) -> pd.DataFrame:
+                     max_stocks: int = 50,
+                     force: bool = False,
+                     max_workers: int = 10) -> pd.DataFrame:
         """
         多条件筛选股票
         
@@ -47,6 +54,8 @@ class AdvancedStockScreener:
             exclude_kcb: 是否排除科创板(688开头)
             exclude_st: 是否排除ST股票
             max_stocks: 最多分析的股票数量
+            force: 忽略收盘后已缓存的结果，重新筛选
+            max_workers: 并行获取历史数据的线程数
             
         Returns:
             DataFrame: 符合条件的股票列表
@@ -55,9 +64,25 @@ class AdvancedStockScreener:
         print("开始高级股票筛选...")
         print("=" * 60)
         
+        params = (min_price_to_ma120_ratio, max_price_to_ma120_ratio,
+                  min_daily_change, max_daily_change, check_limit_up_days,
+                  min_market_cap, max_market_cap, min_turnover, max_turnover,
+                  exclude_kcb, exclude_st, max_stocks)
+        cache_key = str(params)
+        # 交易时段内为 0；收盘后为距下一交易时段的秒数，即缓存结果的有效期
+        cache_ttl = seconds_until_next_session()
+        if cache_ttl and not force:
+            cached = self._results_cache.get(cache_key)
+            if cached is not None:
+                print(f"\n使用收盘后已保存的筛选结果: {len(cached)} 只 (使用 force 重新筛选)")
+                self.results = cached
+                return cached
+        
         # 获取股票列表
         print("\n正在获取股票列表...")
-        stock_list = self.fetcher.get_stock_list()
+        # 进程内共享的列表缓存，同一进程先后运行多个选股策略时不重复拉取全市场列表；
+        # 有效期与 fetcher 的内存缓存一致，盘中不会用到过旧的涨跌幅
+        stock_list = get_stock_list_cached()
         
         if stock_list.empty:
             print("无法获取股票列表")
@@ -66,131 +91,107 @@ class AdvancedStockScreener:
         print(f"获取到 {len(stock_list)} 只股票")
         
         # 第一步:基础筛选(快速过滤)
+        # 各条件在 NumPy 数组上逐步累积为一个掩码，最后只索引一次 DataFrame
         print("\n第一步:基础条件筛选...")
-        filtered_stocks = stock_list.copy()
+        codes = stock_list['代码'].to_numpy(dtype=str)
+        change = stock_list['涨跌幅'].to_numpy(dtype=np.float64)
+        turnover = stock_list['换手率'].to_numpy(dtype=np.float64)
+        market_cap = stock_list['总市值'].to_numpy(dtype=np.float64)
+        mask = np.ones(len(stock_list), dtype=bool)
         
         # 排除科创板(688开头)
         if exclude_kcb:
-            filtered_stocks = filtered_stocks[~filtered_stocks['代码'].str.startswith('688')]
-            print(f"  排除科创板后: {len(filtered_stocks)} 只")
+            mask &= ~np.char.startswith(codes, '688')
+            print(f"  排除科创板后: {mask.sum()} 只")
         
         # 排除ST股票
         if exclude_st:
-            filtered_stocks = filtered_stocks[~filtered_stocks['名称'].str.contains('ST', na=False)]
-            print(f"  排除ST股票后: {len(filtered_stocks)} 只")
+            names = stock_list['名称'].to_numpy(dtype=str)
+            mask &= np.char.find(names, 'ST') < 0
+            print(f"  排除ST股票后: {mask.sum()} 只")
         
         # 当日涨幅筛选
-        filtered_stocks = filtered_stocks[
-            (filtered_stocks['涨跌幅'] >= min_daily_change) & 
-            (filtered_stocks['涨跌幅'] <= max_daily_change)
-        ]
-        print(f"  当日涨幅{min_daily_change}%-{max_daily_change}%: {len(filtered_stocks)} 只")
+        mask &= (change >= min_daily_change) & (change <= max_daily_change)
+        print(f"  当日涨幅{min_daily_change}%-{max_daily_change}%: {mask.sum()} 只")
         
         # 换手率筛选
-        filtered_stocks = filtered_stocks[
-            (filtered_stocks['换手率'] >= min_turnover) & 
-            (filtered_stocks['换手率'] <= max_turnover)
-        ]
-        print(f"  换手率{min_turnover}%-{max_turnover}%: {len(filtered_stocks)} 只")
+        mask &= (turnover >= min_turnover) & (turnover <= max_turnover)
+        print(f"  换手率{min_turnover}%-{max_turnover}%: {mask.sum()} 只")
         
         # 流通市值筛选(总市值近似替代,单位:亿)
-        filtered_stocks = filtered_stocks[
-            (filtered_stocks['总市值'] >= min_market_cap * 1e8) & 
-            (filtered_stocks['总市值'] <= max_market_cap * 1e8)
-        ]
-        print(f"  流通市值{min_market_cap}-{max_market_cap}亿: {len(filtered_stocks)} 只")
+        mask &= (market_cap >= min_market_cap * 1e8) & (market_cap <= max_market_cap * 1e8)
+        print(f"  流通市值{min_market_cap}-{max_market_cap}亿: {mask.sum()} 只")
         
-        if filtered_stocks.empty:
+        # 通过的行号截断到 max_stocks 后只取一次，且只取后续用到的列
+        positions = np.flatnonzero(mask)
+        if positions.size == 0:
             print("\n没有股票通过基础筛选")
             return pd.DataFrame()
         
         # 限制分析数量
-        if len(filtered_stocks) > max_stocks:
+        if positions.size > max_stocks:
             print(f"\n股票数量较多,仅分析前 {max_stocks} 只")
-            filtered_stocks = filtered_stocks.head(max_stocks)
+            positions = positions[:max_stocks]
+        filtered_stocks = stock_list.iloc[positions][['代码', '名称', '涨跌幅', '换手率', '总市值']]
         
         # 第二步:历史数据筛选(需要获取历史数据)
         print(f"\n第二步:历史数据筛选(共{len(filtered_stocks)}只)...")
         
-        qualified_stocks = []
         end_date = datetime.now().strftime("%Y%m%d")
         start_date = (datetime.now() - timedelta(days=180)).strftime("%Y%m%d")
         
-        for idx, row in filtered_stocks.iterrows():
-            symbol = row['代码']
-            name = row['名称']
-            
-            try:
-                print(f"  正在分析 {symbol} {name}...", end="")
-                
-                # 获取历史数据
-                df = self.fetcher.get_stock_hist(
-                    symbol=symbol,
-                    start_date=start_date,
-                    end_date=end_date
-                )
-                
-                if df.empty or len(df) < 120:
-                    print(" 数据不足")
-                    continue
-                
-                # 计算MA120
-                df['MA120'] = df['收盘'].rolling(window=120).mean()
-                
-                # 获取最新数据
-                latest = df.iloc[-1]
-                
-                # 检查股价是否在MA120附近
-                if pd.isna(latest['MA120']):
-                    print(" MA120数据不足")
-                    continue
-                
-                price_to_ma120 = latest['收盘'] / latest['MA120']
-                
-                if not (min_price_to_ma120_ratio <= price_to_ma120 <= max_price_to_ma120_ratio):
-                    print(f" 股价/MA120={price_to_ma120:.3f} 不符合")
-                    continue
-                
-                # 检查最近N天内是否有涨停(涨幅>9.5%)
-                recent_days = df.tail(check_limit_up_days)
-                has_limit_up = (recent_days['涨跌幅'] >= 9.5).any()
-                
-                if not has_limit_up:
-                    print(" 近期无涨停")
-                    continue
-                
-                # 找到涨停的日期
-                limit_up_dates = recent_days[recent_days['涨跌幅'] >= 9.5]['日期'].tolist()
-                
-                # 通过所有条件
-                qualified_stocks.append({
-                    '代码': symbol,
-                    '名称': name,
-                    '最新价': latest['收盘'],
-                    '当日涨幅': row['涨跌幅'],
-                    'MA120': latest['MA120'],
-                    '价格/MA120': price_to_ma120,
-                    '换手率': row['换手率'],
-                    '总市值(亿)': row['总市值'] / 1e8,
-                    '涨停日期': limit_up_dates[-1].strftime('%Y-%m-%d'),
-                    '涨停次数': len(limit_up_dates)
-                })
-                
-                print(" ✓ 符合条件!")
-                
-                # 避免请求过快
-                time.sleep(0.3)
-                
-            except Exception as e:
-                print(f" 错误: {e}")
-                continue
+        # 后台并发下载，主线程按完成顺序接收并显示进度，全部到齐后统一分析
+        symbols = filtered_stocks['代码'].tolist()
+        histories = {}
+        for symbol, df in self.fetcher.iter_stock_hist(
+                symbols, start_date, end_date, max_workers=max_workers):
+            histories[symbol] = df
+            print(f"  已获取历史数据 {len(histories)}/{len(symbols)}", end='\r')
+        print()
+        
+        # 所有股票的MA120和涨停统计一次算出
+        summary = self._history_summary(histories, symbols, check_limit_up_days,
+                                        min_price_to_ma120_ratio, max_price_to_ma120_ratio)
+        summary = summary.join(filtered_stocks.set_index('代码'))
+        summary['价格/MA120'] = summary['最新价'] / summary['MA120']
+        
+        enough_data = summary['交易日数'].to_numpy() >= 120
+        has_ma120 = enough_data & summary['MA120'].notna().to_numpy()
+        ratio = summary['价格/MA120'].to_numpy()
+        ratio_ok = has_ma120 & (ratio >= min_price_to_ma120_ratio) & (ratio <= max_price_to_ma120_ratio)
+        passed = ratio_ok & (summary['涨停次数'].to_numpy() > 0)
+        
+        # 汇总未通过原因，只逐只输出符合条件的股票，减少终端输出
+        reasons = np.select(
+            [~enough_data, ~has_ma120, ~ratio_ok, ~passed],
+            ['数据不足', 'MA120数据不足', '股价/MA120不符合', '近期无涨停'],
+            default=''
+        )
+        lines = [f"  ✓ {symbol} {name} 符合条件!"
+                 for symbol, name in zip(summary.index[passed], summary['名称'].to_numpy()[passed])]
+        skipped = Counter(reasons[~passed])
+        if skipped:
+            lines.append("  未通过: " + ", ".join(f"{reason} {count}只" for reason, count in skipped.most_common()))
+        print("\n".join(lines))
         
         # 整理结果
-        if not qualified_stocks:
+        if not passed.any():
             print("\n没有股票符合所有条件")
             return pd.DataFrame()
         
-        result_df = pd.DataFrame(qualified_stocks)
+        qualified = summary[passed]
+        result_df = pd.DataFrame({
+            '代码': qualified.index,
+            '名称': qualified['名称'].to_numpy(),
+            '最新价': qualified['最新价'].to_numpy(),
+            '当日涨幅': qualified['涨跌幅'].to_numpy(),
+            'MA120': qualified['MA120'].to_numpy(),
+            '价格/MA120': qualified['价格/MA120'].to_numpy(),
+            '换手率': qualified['换手率'].to_numpy(),
+            '总市值(亿)': qualified['总市值'].to_numpy() / 1e8,
+            '涨停日期': qualified['涨停日期'].dt.strftime('%Y-%m-%d').to_numpy(),
+            '涨停次数': qualified['涨停次数'].to_numpy(dtype=int),
+        })
         
         # 按涨幅排序
         result_df = result_df.sort_values('当日涨幅', ascending=False)
@@ -200,8 +201,62 @@ class AdvancedStockScreener:
         print("=" * 60)
         
         self.results = result_df
+        if cache_ttl:
+            self._results_cache.set(cache_key, result_df, ttl=cache_ttl)
         return result_df
     
+    @staticmethod
+    def _history_summary(histories: Dict[str, pd.DataFrame],
+                         symbols: List[str],
+                         check_limit_up_days: int,
+                         min_price_to_ma120_ratio: float,
+                         max_price_to_ma120_ratio: float) -> pd.DataFrame:
+        """
+        汇总各股票的历史数据指标
+        
+        所有股票的数组拼接后交给编译内核一次计算，避免逐只股票的 pandas 小操作
+        
+        Args:
+            histories: {股票代码: 历史数据}
+            symbols: 股票代码列表(决定输出顺序)
+            check_limit_up_days: 检查涨停的天数范围
+            min_price_to_ma120_ratio: 股价/MA120 最小比例
+            max_price_to_ma120_ratio: 股价/MA120 最大比例
+            
+        Returns:
+            DataFrame: index=代码，列为 交易日数、最新价、MA120、涨停日期(最近一次)、涨停次数；
+                       股价/MA120 不在区间内的股票不统计涨停
+        """
+        frames = [histories[symbol] for symbol in symbols]
+        lengths = np.array([len(df) for df in frames], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        
+        # 所有股票的数据首尾相接，由编译内核一次完成计算
+        valid = [df for df in frames if not df.empty]
+        if valid:
+            close = np.concatenate([df['收盘'].to_numpy(dtype=np.float64) for df in valid])
+            pct_chg = np.concatenate([df['涨跌幅'].to_numpy(dtype=np.float64) for df in valid])
+        else:
+            close = pct_chg = np.empty(0, dtype=np.float64)
+        
+        last_close, ma120, last_hit, hits = screen_kernel(
+            close, pct_chg, offsets, 120, check_limit_up_days, 9.5,
+            min_price_to_ma120_ratio, max_price_to_ma120_ratio
+        )
+        
+        # 日期列保持获取时的 datetime64，只取出有涨停的股票的那一个日期
+        hit_dates = np.full(len(symbols), np.datetime64('NaT'), dtype='datetime64[ns]')
+        for i in np.flatnonzero(last_hit >= 0):
+            hit_dates[i] = frames[i]['日期'].to_numpy()[last_hit[i] - offsets[i]]
+        
+        return pd.DataFrame({
+            '交易日数': lengths,
+            '最新价': last_close,
+            'MA120': ma120,
+            '涨停日期': hit_dates,
+            '涨停次数': hits,
+        }, index=pd.Index(symbols, name='代码'))
+    
     def save_results(self, filename: str = None):
         """
         保存筛选结果到CSV文件
@@ -229,21 +284,19 @@ class AdvancedStockScreener:
         print("筛选结果详情:")
         print("=" * 80)
         
-        # 设置显示选项
-        pd.set_option('display.max_columns', None)
-        pd.set_option('display.width', None)
-        pd.set_option('display.unicode.east_asian_width', True)
-        
-        # 格式化显示
-        display_df = self.results.copy()
-        display_df['最新价'] = display_df['最新价'].apply(lambda x: f"{x:.2f}")
-        display_df['当日涨幅'] = display_df['当日涨幅'].apply(lambda x: f"{x:.2f}%")
-        display_df['MA120'] = display_df['MA120'].apply(lambda x: f"{x:.2f}")
-        display_df['价格/MA120'] = display_df['价格/MA120'].apply(lambda x: f"{x:.3f}")
-        display_df['换手率'] = display_df['换手率'].apply(lambda x: f"{x:.2f}%")
-        display_df['总市值(亿)'] = display_df['总市值(亿)'].apply(lambda x: f"{x:.2f}")
-        
-        print(display_df.to_string(index=False))
+        # 显示时逐格格式化，不修改/复制结果数据
+        formatters = {
+            '最新价': '{:.2f}'.format,
+            '当日涨幅': '{:.2f}%'.format,
+            'MA120': '{:.2f}'.format,
+            '价格/MA120': '{:.3f}'.format,
+            '换手率': '{:.2f}%'.format,
+            '总市值(亿)': '{:.2f}'.format,
+        }
+        with pd.option_context('display.max_columns', None,
+                               'display.width', None,
+                               'display.unicode.east_asian_width', True):
+            print(self.results.to_string(index=False, formatters=formatters))
         print("=" * 80)
     
     def get_detailed_analysis(self, symbol: str):
@@ -285,14 +338,21 @@ class AdvancedStockScreener:
         print(df[available_columns].tail(10).to_string(index=False))
         
         # 统计涨停信息
-        limit_ups = df[df['涨跌幅'] >= 9.5].tail(5)
+        hit_pos = np.flatnonzero(df['涨跌幅'].to_numpy() >= 9.5)[-5:]
+        limit_ups = df.iloc[hit_pos]
         if not limit_ups.empty:
             print(f"\n最近涨停记录(共{len(limit_ups)}次):")
             print(limit_ups[['日期', '收盘', '涨跌幅', '成交量']].to_string(index=False))
 
 
-def run_custom_screen():
-    """运行自定义筛选"""
+def run_custom_screen(force: bool = False, max_workers: int = 10):
+    """
+    运行自定义筛选
+    
+    Args:
+        force: 忽略收盘后已缓存的结果，重新筛选
+        max_workers: 并行获取历史数据的线程数
+    """
     screener = AdvancedStockScreener()
     
     # 筛选条件
@@ -308,7 +368,9 @@ def run_custom_screen():
         max_turnover=10.0,
         exclude_kcb=True,                # 排除科创板
         exclude_st=True,                 # 排除ST
-        max_stocks=100                   # 最多分析100只
+        max_stocks=100,                  # 最多分析100只
+        force=force,
+        max_workers=max_workers
     )
     
     if not result.empty:
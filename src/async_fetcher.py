@@ -0,0 +1,132 @@
+"""
+异步批量行情获取
+使用单个事件循环 + aiohttp 连接池并发请求K线接口，适合一次获取几十上百只股票的历史数据
+未安装 aiohttp 时 HAS_AIOHTTP 为 False，调用方应回退到线程池
+"""
+import asyncio
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+from src.eastmoney import (KLINE_RATE_LIMIT, KLINE_URL, json_loads, kline_params, parse_kline,
+                           parse_retry_after)
+
+# 被限流(HTTP 429/503)时的最大请求次数
+MAX_ATTEMPTS = 3
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+
+async def fetch_hist(session, semaphore: asyncio.Semaphore, symbol: str,
+                     start_date: str, end_date: str,
+                     period: str = "daily", adjust: str = "qfq") -> pd.DataFrame:
+    """
+    获取单只股票历史数据
+
+    Args:
+        session: aiohttp.ClientSession
+        semaphore: 并发上限
+        symbol: 股票代码
+        start_date: 开始日期
+        end_date: 结束日期
+        period: 周期
+        adjust: 复权类型
+
+    Returns:
+        DataFrame: 历史行情；失败时返回空 DataFrame
+    """
+    params = kline_params(symbol, start_date, end_date, period, adjust)
+    try:
+        async with semaphore:
+            for attempt in range(MAX_ATTEMPTS):
+                await KLINE_RATE_LIMIT.acquire_async()
+                async with session.get(KLINE_URL, params=params) as response:
+                    if response.status in (429, 503):
+                        # 按 Retry-After 暂停限速器，所有协程的后续请求（包括本次重试）都等到之后
+                        KLINE_RATE_LIMIT.pause(parse_retry_after(response.headers.get('Retry-After')))
+                        continue
+                    payload = await response.json(content_type=None, loads=json_loads)
+                return parse_kline(payload, symbol)
+    except Exception:
+        pass
+    return pd.DataFrame()
+
+
+async def fetch_many(symbols: List[str], start_date: str, end_date: str,
+                     period: str = "daily", adjust: str = "qfq",
+                     concurrency: int = 50) -> Dict[str, pd.DataFrame]:
+    """
+    并发获取多只股票历史数据
+
+    Args:
+        symbols: 股票代码列表
+        start_date: 开始日期
+        end_date: 结束日期
+        period: 周期
+        adjust: 复权类型
+        concurrency: 同时进行的最大请求数
+
+    Returns:
+        dict: {股票代码: DataFrame}
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        frames = await asyncio.gather(*[
+            fetch_hist(session, semaphore, symbol, start_date, end_date, period, adjust)
+            for symbol in symbols
+        ])
+    return dict(zip(symbols, frames))
+
+
+async def fetch_each(symbols: List[str], start_date: str, end_date: str,
+                     callback: Callable[[str, pd.DataFrame], None],
+                     period: str = "daily", adjust: str = "qfq",
+                     concurrency: int = 50):
+    """
+    并发获取多只股票历史数据，每只股票完成时立即回调
+
+    Args:
+        symbols: 股票代码列表
+        start_date: 开始日期
+        end_date: 结束日期
+        callback: 回调函数 callback(symbol, df)，按完成顺序逐个调用；
+            在线程池中执行，回调阻塞（如写入有界队列）时不会卡住事件循环中的其他请求
+        period: 周期
+        adjust: 复权类型
+        concurrency: 同时进行的最大请求数
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=30)
+
+    async def fetch_one(session, symbol):
+        return symbol, await fetch_hist(session, semaphore, symbol,
+                                        start_date, end_date, period, adjust)
+
+    loop = asyncio.get_running_loop()
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        tasks = [fetch_one(session, symbol) for symbol in symbols]
+        for finished in asyncio.as_completed(tasks):
+            symbol, df = await finished
+            await loop.run_in_executor(None, callback, symbol, df)
+
+
+def fetch_each_sync(symbols: List[str], start_date: str, end_date: str,
+                    callback: Callable[[str, pd.DataFrame], None],
+                    period: str = "daily", adjust: str = "qfq",
+                    concurrency: int = 50):
+    """fetch_each 的同步入口"""
+    asyncio.run(fetch_each(symbols, start_date, end_date, callback, period, adjust, concurrency))
+
+
+def fetch_many_sync(symbols: List[str], start_date: str, end_date: str,
+                    period: str = "daily", adjust: str = "qfq",
+                    concurrency: int = 50) -> Dict[str, pd.DataFrame]:
+    """fetch_many 的同步入口"""
+    return asyncio.run(fetch_many(symbols, start_date, end_date, period, adjust, concurrency))
@@ -0,0 +1,86 @@
+"""
+回测公共函数
+全仓买入、全仓卖出的简单回测: 空仓时遇买入信号买入，持仓时遇卖出信号卖出，
+其余信号忽略；整段回测用数组运算一次完成
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def effective_trades(buy: np.ndarray, sell: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    从买卖信号中找出实际成交的行
+
+    空仓时的卖出信号、持仓时的买入信号不成交，
+    因此成交的信号就是与上一个信号方向不同的信号（第一个信号视为紧跟在卖出之后）
+
+    Args:
+        buy: 买入信号掩码
+        sell: 卖出信号掩码（与 buy 同一行同时为真时按买入处理）
+
+    Returns:
+        tuple: (买入行号, 卖出行号)，卖出行号比买入行号少 0 或 1 个
+    """
+    idx = np.flatnonzero(buy | sell)
+    is_buy = buy[idx]
+    changed = is_buy != np.concatenate(([False], is_buy[:-1]))
+    idx, is_buy = idx[changed], is_buy[changed]
+    return idx[is_buy], idx[~is_buy]
+
+
+def run_backtest(buy: np.ndarray,
+                 sell: np.ndarray,
+                 close: np.ndarray,
+                 dates: pd.Series,
+                 initial_capital: float) -> Tuple[float, List[Dict]]:
+    """
+    按买卖信号回测
+
+    Args:
+        buy: 买入信号掩码
+        sell: 卖出信号掩码
+        close: 收盘价
+        dates: 日期列
+        initial_capital: 初始资金
+
+    Returns:
+        tuple: (最终资金, 交易记录列表)
+    """
+    buy_idx, sell_idx = effective_trades(buy, sell)
+    buy_price = close[buy_idx]
+    sell_price = close[sell_idx]
+
+    # 第 k 次买入时的资金 = 初始资金 * 前 k 次交易的收益倍数之积
+    multiple = np.cumprod(sell_price / buy_price[:len(sell_idx)])
+    capital_before = initial_capital * np.concatenate(([1.0], multiple))[:len(buy_idx)]
+    shares = capital_before / buy_price
+    capital_after = shares[:len(sell_idx)] * sell_price
+
+    if len(buy_idx) > len(sell_idx):
+        final_value = shares[-1] * close[-1]
+    else:
+        final_value = capital_after[-1] if len(sell_idx) else initial_capital
+
+    # 日期按 Series 取值，保持 Timestamp 类型
+    buy_dates = dates.iloc[buy_idx].tolist()
+    sell_dates = dates.iloc[sell_idx].tolist()
+    trade_log = []
+    for k in range(len(buy_idx)):
+        trade_log.append({
+            'date': buy_dates[k],
+            'action': 'BUY',
+            'price': buy_price[k],
+            'shares': shares[k]
+        })
+        if k < len(sell_idx):
+            trade_log.append({
+                'date': sell_dates[k],
+                'action': 'SELL',
+                'price': sell_price[k],
+                'shares': shares[k],
+                'profit': capital_after[k] - initial_capital
+            })
+
+    return final_value, trade_log
@@ -0,0 +1,144 @@
+"""
+本地磁盘缓存模块
+将接口返回的 DataFrame 持久化到磁盘，跨进程、跨运行复用，减少重复网络请求
+
+读取顺序: 进程内 LRU 内存缓存 -> 磁盘文件
+
+缓存格式:
+- 数据文件: .cache/<endpoint>/<md5>.parquet（未安装 pyarrow 时退化为 .pkl）
+- 元数据:   .cache/<endpoint>/<md5>.json，记录写入时间和有效期 {ts, ttl}
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    _HAS_PARQUET = True
+except ImportError:
+    _HAS_PARQUET = False
+
+
+DEFAULT_CACHE_DIR = '.cache'
+
+
+class FileCache:
+    """基于文件的 DataFrame 缓存（支持有效期）"""
+
+    def __init__(self, endpoint: str, root: str = DEFAULT_CACHE_DIR, memory_size: int = 128):
+        """
+        初始化缓存
+
+        Args:
+            endpoint: 接口名称，作为缓存子目录
+            root: 缓存根目录
+            memory_size: 内存中最多保留的条目数，0 表示不使用内存缓存
+        """
+        self.directory = os.path.join(root, endpoint)
+        self.memory_size = memory_size
+        # key -> (过期时间戳或 None, DataFrame)，按最近使用排序
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _memory_get(self, key: str) -> Optional[pd.DataFrame]:
+        """读取内存缓存，过期条目顺便删除"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, df = entry
+            if expires_at is not None and time.time() > expires_at:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return df
+
+    def _memory_set(self, key: str, df: pd.DataFrame, expires_at: Optional[float]):
+        """写入内存缓存，超出容量时淘汰最久未使用的条目"""
+        if self.memory_size <= 0:
+            return
+        with self._lock:
+            self._memory[key] = (expires_at, df)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _paths(self, key: str) -> tuple:
+        """返回 (数据文件路径, 元数据路径)"""
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, digest)
+        ext = 'parquet' if _HAS_PARQUET else 'pkl'
+        return f"{base}.{ext}", f"{base}.json"
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            DataFrame: 缓存数据；未命中或已过期返回 None
+        """
+        df = self._memory_get(key)
+        if df is not None:
+            return df
+
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+
+            ttl = meta.get('ttl')
+            if ttl is not None and time.time() - meta['ts'] > ttl:
+                return None
+
+            if _HAS_PARQUET:
+                df = pd.read_parquet(data_path)
+            else:
+                df = pd.read_pickle(data_path)
+            self._memory_set(key, df, None if ttl is None else meta['ts'] + ttl)
+            return df
+        except Exception:
+            # 文件不存在或已损坏，视为未命中
+            return None
+
+    def set(self, key: str, df: pd.DataFrame, ttl: Optional[float] = None):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            df: 要缓存的数据
+            ttl: 有效期（秒），None 表示永久有效
+        """
+        now = time.time()
+        self._memory_set(key, df, None if ttl is None else now + ttl)
+
+        data_path, meta_path = self._paths(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+
+            # 先写临时文件再替换，避免并发读到写了一半的文件
+            suffix = f"{os.getpid()}.{threading.get_ident()}.tmp"
+            tmp_path = f"{data_path}.{suffix}"
+            if _HAS_PARQUET:
+                df.to_parquet(tmp_path, compression='zstd')
+            else:
+                df.to_pickle(tmp_path)
+            os.replace(tmp_path, data_path)
+
+            # 元数据最后写入，存在即代表数据文件完整
+            tmp_meta = f"{meta_path}.{suffix}"
+            with open(tmp_meta, 'w', encoding='utf-8') as f:
+                json.dump({'ts': now, 'ttl': ttl}, f)
+            os.replace(tmp_meta, meta_path)
+        except Exception:
+            # 缓存写入失败不影响主流程
+            pass
@@ -0,0 +1,109 @@
+"""
+命令行参数定义
+各启动脚本共用的 argparse 解析器，只在首次调用时构建
+"""
+import argparse
+from functools import lru_cache
+
+
+def add_verbose_arg(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
+    """
+    添加 -v/--verbose 参数，可重复使用以显示更详细的日志
+
+    Args:
+        parser: 参数解析器
+
+    Returns:
+        ArgumentParser: 同一个解析器，便于链式调用
+    """
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                       help='显示数据获取过程的日志 (-vv 显示调试信息)')
+    return parser
+
+
+def add_tail_filter_args(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
+    """
+    添加尾盘选股的筛选参数
+
+    Args:
+        parser: 参数解析器
+
+    Returns:
+        ArgumentParser: 同一个解析器，便于链式调用
+    """
+    parser.add_argument('--workers', type=int, default=10,
+                       help='并行线程数 (默认10，建议5-15)')
+    parser.add_argument('--min-change', type=float, default=1.3,
+                       help='最小涨幅%% (默认1.3)')
+    parser.add_argument('--max-change', type=float, default=5.0,
+                       help='最大涨幅%% (默认5.0)')
+    parser.add_argument('--min-volume-ratio', type=float, default=1.0,
+                       help='最小量比 (默认1.0)')
+    parser.add_argument('--min-turnover', type=float, default=5.0,
+                       help='最小换手率%% (默认5.0)')
+    parser.add_argument('--max-turnover', type=float, default=10.0,
+                       help='最大换手率%% (默认10.0)')
+    parser.add_argument('--min-cap', type=float, default=50,
+                       help='最小市值(亿) (默认50)')
+    parser.add_argument('--max-cap', type=float, default=200,
+                       help='最大市值(亿) (默认200)')
+    parser.add_argument('--exclude-cyb', action='store_true',
+                       help='排除创业板')
+    parser.add_argument('--debug', action='store_true',
+                       help='启用调试日志')
+    return parser
+
+
+@lru_cache(maxsize=None)
+def make_tail_parser(description: str = '尾盘选股器 - 优化版') -> argparse.ArgumentParser:
+    """构建尾盘选股器的参数解析器"""
+    parser = argparse.ArgumentParser(
+        description=description,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  python run_tail_market.py                          # 使用默认参数
+  python run_tail_market.py --workers 15             # 使用15个线程
+  python run_tail_market.py --min-cap 80 --max-cap 150   # 市值80-150亿
+  python run_tail_market.py --exclude-cyb            # 排除创业板
+        """
+    )
+    return add_verbose_arg(add_tail_filter_args(parser))
+
+
+@lru_cache(maxsize=1)
+def make_query_parser() -> argparse.ArgumentParser:
+    """构建股票查询工具的参数解析器"""
+    parser = argparse.ArgumentParser(
+        description='股票信息查询工具 (支持代码或名称搜索)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  python run_stock_query.py 000001              # 用代码查询平安银行
+  python run_stock_query.py 平安银行            # 用名称查询
+  python run_stock_query.py 茅台                # 模糊搜索
+  python run_stock_query.py 中国长城 --hist     # 查询历史K线
+  python run_stock_query.py 宁德时代 --tech     # 查询技术指标
+  python run_stock_query.py 比亚迪 --all        # 查询全部信息
+  python run_stock_query.py 银行                # 搜索包含"银行"的股票
+        """
+    )
+    
+    parser.add_argument('keyword', type=str, help='股票代码或名称 (支持模糊搜索)')
+    parser.add_argument('--hist', '-H', action='store_true', help='显示历史K线')
+    parser.add_argument('--days', '-d', type=int, default=60, help='历史数据天数 (默认60)')
+    parser.add_argument('--detail', '-D', action='store_true', help='显示公司详细信息')
+    parser.add_argument('--tech', '-t', action='store_true', help='显示技术指标分析')
+    parser.add_argument('--all', '-a', action='store_true', help='显示全部信息')
+    return add_verbose_arg(parser)
+
+
+@lru_cache(maxsize=1)
+def make_screener_parser() -> argparse.ArgumentParser:
+    """构建高级筛选器的参数解析器"""
+    parser = argparse.ArgumentParser(description='A股高级筛选器')
+    parser.add_argument('--force', action='store_true',
+                       help='忽略收盘后已缓存的筛选结果，重新筛选')
+    parser.add_argument('--workers', type=int, default=10,
+                       help='并行线程数 (默认10，建议5-15)')
+    return add_verbose_arg(parser)
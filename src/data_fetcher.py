@@ -8,23 +8,50 @@ A股数据获取模块
 3. 缓存机制 - 减少重复请求
 4. 请求配置 - 优化HTTP请求参数
 5. IPv4优先 - 强制使用IPv4连接（解决东方财富IPv6不通问题）
+6. 磁盘缓存 - 股票列表和历史行情持久化到 .cache/，跨运行复用；历史行情按股票增量更新
+7. 批量获取 - 多只股票历史数据通过异步连接池(aiohttp)或线程池并发获取，按完成顺序流式返回
 """
 import akshare as ak
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import Optional, List
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, Optional, List, Tuple
+import http.client
+import logging
+import random
 import time
-from functools import wraps
+import queue
+import threading
+from functools import lru_cache, wraps
 import socket
+import sys
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from src.cache import FileCache
+from src.async_fetcher import HAS_AIOHTTP, fetch_each_sync
+from src.eastmoney import (KLINE_HOST, KLINE_RATE_LIMIT, QUOTE_BATCH_SIZE,
+                           fetch_kline, fetch_quotes)
+
+try:
+    import pyarrow as pa
+    _HAS_PYARROW = True
+except ImportError:
+    _HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+
+# DNS 解析结果缓存时间（秒）
+DNS_CACHE_TTL = 300
 
 
 def force_ipv4(verbose: bool = True):
     """
-    强制使用 IPv4 连接
-    东方财富等数据源可能不支持 IPv6，导致连接超时
+    强制使用 IPv4 连接，并缓存 DNS 解析结果
+    东方财富等数据源可能不支持 IPv6，导致连接超时；
+    批量请求时连接池反复建连，缓存后同一主机在有效期内只解析一次
     
     Args:
         verbose: 是否打印连接的 IP 地址
@@ -35,8 +62,16 @@ def force_ipv4(verbose: bool = True):
     # 记录已打印的主机，避免重复打印
     printed_hosts = set()
     
+    # (host, port, type, proto, flags) -> (过期时间, 解析结果)
+    resolved = {}
+    
     def ipv4_only_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
         """只返回 IPv4 地址，并打印实际 IP"""
+        key = (host, port, type, proto, flags)
+        cached = resolved.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return list(cached[1])
+        
         # 强制使用 IPv4 (AF_INET)
         try:
             result = original_getaddrinfo(host, port, socket.AF_INET, type, proto, flags)
@@ -49,30 +84,35 @@ def force_ipv4(verbose: bool = True):
                 if ips:
                     printed_hosts.add(host)
                     unique_ips = list(set(ips))
-                    print(f"  [DNS] {host} -> {', '.join(unique_ips)} (IPv4)")
+                    logger.debug("  [DNS] %s -> %s (IPv4)", host, ', '.join(unique_ips))
             
+            if result:
+                resolved[key] = (time.monotonic() + DNS_CACHE_TTL, result)
             return result
         except socket.gaierror as e:
             # 如果 IPv4 解析失败，打印错误
             if verbose:
-                print(f"  [DNS] {host} 解析失败: {e}")
+                logger.debug("  [DNS] %s 解析失败: %s", host, e)
             raise
     
     # 替换为只使用 IPv4 的版本
     socket.getaddrinfo = ipv4_only_getaddrinfo
-    print("  [网络] 已启用 IPv4 优先模式")
+    logger.debug("  [网络] 已启用 IPv4 优先模式")
 
 
 # 启动时强制使用 IPv4
 force_ipv4(verbose=True)
 
 
+# 启动时预热的主机: 经共享会话请求的行情接口
+PREWARM_HOSTS = ("push2.eastmoney.com", "hq.sinajs.cn")
+
+
 def configure_requests():
     """
-    配置 requests 默认参数
-    - 增加超时时间
+    配置 requests 连接池
     - 配置重试策略
-    - 设置连接池
+    - 设置连接池（批量并发请求时复用 TCP/TLS 连接）
     """
     # 配置重试策略
     retry_strategy = Retry(
@@ -84,61 +124,187 @@ def configure_requests():
     # 创建适配器
     adapter = HTTPAdapter(
         max_retries=retry_strategy,
-        pool_connections=10,
-        pool_maxsize=10
+        pool_connections=32,
+        pool_maxsize=64
     )
     
     # 创建会话并挂载适配器
     session = requests.Session()
     session.mount("http://", adapter)
     session.mount("https://", adapter)
+    return session
+
+
+def prewarm_connections(session, hosts=PREWARM_HOSTS, dns_only=(KLINE_HOST,)):
+    """
+    在后台线程中预先解析 DNS 并建立 TLS 连接，首次请求不再承担握手延迟
     
-    # 设置默认超时（AKShare 内部使用 requests）
-    # 通过 monkey patch 设置默认超时
-    old_request = requests.Session.request
+    Args:
+        session: requests 会话，建立的连接留在其连接池中
+        hosts: 需要预热连接的主机
+        dns_only: 只预先解析 DNS 的主机（不经 requests 会话请求的主机）
+    """
+    def warm():
+        for host in dns_only:
+            try:
+                socket.getaddrinfo(host, 443, type=socket.SOCK_STREAM)
+            except OSError:
+                pass
+        for host in hosts:
+            try:
+                session.head(f"https://{host}/", timeout=5)
+            except Exception:
+                # 预热失败不影响正常请求
+                pass
     
-    def new_request(self, method, url, **kwargs):
-        # 设置默认超时为 30 秒
-        if 'timeout' not in kwargs:
-            kwargs['timeout'] = 30
-        return old_request(self, method, url, **kwargs)
+    threading.Thread(target=warm, name="prewarm", daemon=True).start()
+
+
+class _PooledRequests:
+    """
+    代替 akshare 各子模块中的 requests 模块
+    get/post/request 走共享会话的连接池并带默认超时，其余属性转发给 requests
+    """
     
-    requests.Session.request = new_request
+    def __init__(self, session, timeout: float = 30):
+        self._session = session
+        self._timeout = timeout
     
-    return session
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self._timeout)
+        return self._session.request(method, url, **kwargs)
+    
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+    
+    def post(self, url, data=None, json=None, **kwargs):
+        return self.request('POST', url, data=data, json=json, **kwargs)
+    
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+def install_session(session) -> int:
+    """
+    让 akshare 使用共享会话（不修改 requests.Session 类本身）
+    akshare 的接口模块大多直接调用 requests.get，这里替换这些模块里的 requests 名称
+    
+    Args:
+        session: requests.Session
+    
+    Returns:
+        int: 替换的模块数
+    """
+    pooled = _PooledRequests(session)
+    patched = 0
+    for name, module in list(sys.modules.items()):
+        if name.startswith('akshare') and getattr(module, 'requests', None) is requests:
+            module.requests = pooled
+            patched += 1
+    return patched
 
 
-# 初始化时配置 requests
+# 初始化时配置共享连接池，并让 akshare 使用
 _session = configure_requests()
+install_session(_session)
+prewarm_connections(_session)
+
+@lru_cache(maxsize=2)
+def _default_date_range(today_ordinal: int) -> Tuple[str, str]:
+    """
+    默认日期区间（最近一年），每天只计算一次
+    
+    Args:
+        today_ordinal: 当天的 date.toordinal()
+    
+    Returns:
+        tuple: (开始日期, 结束日期)，格式 YYYYMMDD
+    """
+    today = date.fromordinal(today_ordinal)
+    start = today - timedelta(days=365)
+    return (f"{start.year:04d}{start.month:02d}{start.day:02d}",
+            f"{today.year:04d}{today.month:02d}{today.day:02d}")
+
+
+def _resolve_date_range(start_date: Optional[str], end_date: Optional[str]) -> Tuple[str, str]:
+    """未指定的开始/结束日期使用默认区间"""
+    if start_date and end_date:
+        return start_date, end_date
+    default_start, default_end = _default_date_range(date.today().toordinal())
+    return start_date or default_start, end_date or default_end
+
+
+# 新浪股票代码的交易所前缀
+_EXCHANGE_PREFIXES = ('sh', 'sz')
 
+# 限制历史行情接口的并发请求数，避免多线程批量获取时被限流
+_hist_semaphore = threading.Semaphore(15)
 
-def retry_request(max_retries: int = 3, delay: float = 1.0, backoff: float = 2.0):
+# 盘中包含当日K线的历史数据缓存有效期（秒），不超过当日收盘时刻
+HIST_INTRADAY_TTL = 3600
+
+# 股票列表内存缓存有效期（秒）: 列表含盘中实时涨跌幅、量比，不宜缓存过久
+STOCK_LIST_TTL = 60
+
+
+def seconds_until_next_session(now: Optional[datetime] = None) -> float:
+    """
+    计算距离下一个交易时段开始的秒数
+    交易时段按工作日 9:15-15:00 近似（不考虑节假日）
+    
+    Args:
+        now: 当前时间，默认取系统时间
+        
+    Returns:
+        float: 秒数；当前处于交易时段内返回 0
+    """
+    now = now or datetime.now()
+    session_start = now.replace(hour=9, minute=15, second=0, microsecond=0)
+    session_end = now.replace(hour=15, minute=0, second=0, microsecond=0)
+    
+    if now.weekday() < 5 and session_start <= now < session_end:
+        return 0
+    
+    # 找到下一个工作日的 9:15
+    next_start = session_start if now < session_start else session_start + timedelta(days=1)
+    while next_start.weekday() >= 5:
+        next_start += timedelta(days=1)
+    return (next_start - now).total_seconds()
+
+
+# 可重试的网络类异常: socket/连接/超时错误（requests 的异常均继承自 OSError）和 HTTP 协议错误
+TRANSIENT_ERRORS = (OSError, http.client.HTTPException)
+
+
+def retry_request(max_retries: int = 3, delay: float = 1.0, backoff: float = 2.0,
+                  max_delay: float = 8.0, retry_on: tuple = TRANSIENT_ERRORS):
     """
     重试装饰器 - 网络请求失败时自动重试
     
+    只重试 retry_on 中的网络类异常，其它异常（如 KeyError 等代码错误）直接抛出；
+    重试间隔带随机抖动，避免多线程同时失败后又同时重试
+    
     Args:
         max_retries: 最大重试次数
         delay: 初始重试间隔（秒）
         backoff: 退避系数（每次重试间隔乘以此系数）
+        max_delay: 重试间隔上限（秒）
+        retry_on: 需要重试的异常类型
     """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            last_exception = None
-            current_delay = delay
-            
             for attempt in range(max_retries):
                 try:
                     return func(*args, **kwargs)
-                except Exception as e:
-                    last_exception = e
+                except retry_on as e:
                     if attempt < max_retries - 1:
-                        print(f"  请求失败 (尝试 {attempt + 1}/{max_retries}): {type(e).__name__}")
-                        print(f"  {current_delay:.1f}秒后重试...")
-                        time.sleep(current_delay)
-                        current_delay *= backoff
+                        wait = min(max_delay, delay * backoff ** attempt) * random.uniform(0.5, 1.5)
+                        logger.info("  请求失败 (尝试 %d/%d): %s，%.1f秒后重试...",
+                                    attempt + 1, max_retries, type(e).__name__, wait)
+                        time.sleep(wait)
                     else:
-                        print(f"  请求失败 (已重试{max_retries}次): {e}")
+                        logger.warning("  请求失败 (已重试%d次): %s", max_retries, e)
             
             # 返回 None 或空 DataFrame，而不是抛出异常
             return None
@@ -149,12 +315,49 @@ def retry_request(max_retries: int = 3, delay: float = 1.0, backoff: float = 2.0
 class StockDataFetcher:
     """A股数据获取器"""
     
+    # 新浪接口字段映射 -> 东方财富字段
+    SINA_COLUMNS = {
+        'symbol': '代码',
+        'code': '代码', 
+        'name': '名称',
+        'trade': '最新价',
+        'price': '最新价',
+        'pricechange': '涨跌额',
+        'changepercent': '涨跌幅',
+        'buy': '买入',
+        'sell': '卖出',
+        'settlement': '昨收',
+        'open': '今开',
+        'high': '最高',
+        'low': '最低',
+        'volume': '成交量',
+        'amount': '成交额',
+        'ticktime': '时间',
+        'per': '市盈率-动态',
+        'pb': '市净率',
+        'mktcap': '总市值',
+        'nmc': '流通市值',
+        'turnoverratio': '换手率',
+    }
+    
     def __init__(self):
         """初始化数据获取器"""
         self.cache = {}
         self._stock_list_cache = None
         self._stock_list_cache_time = None
-        self._cache_ttl = 60  # 缓存有效期（秒）
+        self._cache_ttl = STOCK_LIST_TTL  # 缓存有效期（秒）
+        # 缓存失效时只允许一个线程请求股票列表，其余线程等待同一次请求的结果
+        self._stock_list_lock = threading.Lock()
+        self._stock_list_flight: Optional[Future] = None
+        # (快照, {代码: 行数据})，实时行情按代码直接查找
+        self._realtime_index = None
+        # (股票列表, 可选股票代码)，股票列表刷新后重新计算
+        self._screenable_cache = None
+        # 磁盘缓存，不同实例/不同进程之间共享
+        self._list_disk_cache = FileCache('stock_list')
+        self._hist_disk_cache = FileCache('hist')
+        # 按股票保存已收盘的完整K线序列，用于增量获取
+        self._hist_store = FileCache('hist_store')
     
     def _normalize_stock_data(self, df: pd.DataFrame, source: str) -> pd.DataFrame:
         """
@@ -170,38 +373,14 @@ class StockDataFetcher:
         if df is None or df.empty:
             return df
         
-        # 新浪接口字段映射 -> 东方财富字段
-        sina_mapping = {
-            'symbol': '代码',
-            'code': '代码', 
-            'name': '名称',
-            'trade': '最新价',
-            'price': '最新价',
-            'pricechange': '涨跌额',
-            'changepercent': '涨跌幅',
-            'buy': '买入',
-            'sell': '卖出',
-            'settlement': '昨收',
-            'open': '今开',
-            'high': '最高',
-            'low': '最低',
-            'volume': '成交量',
-            'amount': '成交额',
-            'ticktime': '时间',
-            'per': '市盈率-动态',
-            'pb': '市净率',
-            'mktcap': '总市值',
-            'nmc': '流通市值',
-            'turnoverratio': '换手率',
-        }
-        
         if source == 'sina':
             # 重命名列
-            df = df.rename(columns=sina_mapping)
+            df = df.rename(columns=self.SINA_COLUMNS)
             
-            # 处理代码格式（新浪可能带 sh/sz 前缀）
+            # 处理代码格式（新浪可能带 sh/sz 前缀），前缀定长，直接切片
             if '代码' in df.columns:
-                df['代码'] = df['代码'].astype(str).str.replace(r'^(sh|sz)', '', regex=True)
+                df['代码'] = [code[2:] if code[:2] in _EXCHANGE_PREFIXES else code
+                            for code in df['代码'].astype(str)]
         
         return df
     
@@ -213,25 +392,25 @@ class StockDataFetcher:
         # 尝试东方财富接口
         for attempt in range(3):
             try:
-                print(f"  尝试东方财富接口 ({attempt + 1}/3)...")
+                logger.debug("  尝试东方财富接口 (%d/3)...", attempt + 1)
                 df = ak.stock_zh_a_spot_em()
                 if df is not None and not df.empty:
-                    print(f"  成功获取 {len(df)} 只股票")
+                    logger.info("  成功获取 %d 只股票", len(df))
                     return self._normalize_stock_data(df, 'em')
             except Exception as e:
-                print(f"  东方财富接口失败: {type(e).__name__}")
+                logger.info("  东方财富接口失败: %s", type(e).__name__)
                 if attempt < 2:
-                    time.sleep(2 * (attempt + 1))
+                    time.sleep(2 * (attempt + 1) * random.uniform(0.5, 1.5))
         
         # 尝试新浪接口作为备用
-        print("  尝试新浪备用接口...")
+        logger.debug("  尝试新浪备用接口...")
         try:
             df = ak.stock_zh_a_spot()
             if df is not None and not df.empty:
-                print(f"  新浪接口成功，获取 {len(df)} 只股票")
+                logger.info("  新浪接口成功，获取 %d 只股票", len(df))
                 return self._normalize_stock_data(df, 'sina')
         except Exception as e:
-            print(f"  新浪接口也失败: {e}")
+            logger.warning("  新浪接口也失败: %s", e)
         
         return None
     
@@ -240,7 +419,7 @@ class StockDataFetcher:
         获取A股股票列表
         
         Args:
-            use_cache: 是否使用缓存（60秒内有效）
+            use_cache: 是否使用缓存（内存60秒内有效；收盘后磁盘缓存至下一交易时段）
         
         Returns:
             DataFrame: 包含股票代码、名称等信息
@@ -271,20 +450,71 @@ class StockDataFetcher:
             60日涨跌幅	float64	注意单位: %
             年初至今涨跌幅	float64	注意单位: %
         """
-        # 检查缓存是否有效
-        if use_cache and self._stock_list_cache is not None:
-            if self._stock_list_cache_time:
-                elapsed = (datetime.now() - self._stock_list_cache_time).total_seconds()
-                if elapsed < self._cache_ttl:
-                    print(f"  使用缓存数据 (有效期还剩 {self._cache_ttl - elapsed:.0f}秒)")
-                    return self._stock_list_cache
+        # 检查缓存是否有效（无锁快速路径）
+        if use_cache:
+            cached = self._cached_stock_list()
+            if cached is not None:
+                return cached
+        
+        with self._stock_list_lock:
+            # 等锁期间其它线程可能已刷新缓存，再检查一次
+            if use_cache:
+                cached = self._cached_stock_list()
+                if cached is not None:
+                    return cached
+            # 已有请求在进行时直接等待它的结果，同一时刻最多一次全市场请求
+            flight = self._stock_list_flight
+            leader = flight is None
+            if leader:
+                flight = Future()
+                self._stock_list_flight = flight
+        
+        if not leader:
+            return flight.result()
         
+        try:
+            result = self._refresh_stock_list()
+            flight.set_result(result)
+            return result
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._stock_list_lock:
+                self._stock_list_flight = None
+    
+    def _memory_stock_list(self) -> Optional[pd.DataFrame]:
+        """内存缓存的股票列表，过期或不存在时返回 None"""
+        cache, cache_time = self._stock_list_cache, self._stock_list_cache_time
+        if cache is None or cache_time is None:
+            return None
+        if (datetime.now() - cache_time).total_seconds() >= self._cache_ttl:
+            return None
+        return cache
+    
+    def _cached_stock_list(self) -> Optional[pd.DataFrame]:
+        """依次查内存缓存和磁盘缓存，都未命中时返回 None"""
+        cached = self._memory_stock_list()
+        if cached is not None:
+            elapsed = (datetime.now() - self._stock_list_cache_time).total_seconds()
+            logger.debug("  使用缓存数据 (有效期还剩 %.0f秒)", self._cache_ttl - elapsed)
+            return cached
+        
+        # 内存缓存失效，尝试磁盘缓存
+        cached = self._list_disk_cache.get('spot')
+        if cached is not None:
+            self._stock_list_cache = cached
+            self._stock_list_cache_time = datetime.now()
+        return cached
+    
+    def _refresh_stock_list(self) -> pd.DataFrame:
+        """请求股票列表并写入内存和磁盘缓存"""
         try:
             # 获取沪深A股列表（带重试）
             stock_list = self._fetch_stock_list_raw()
             
             if stock_list is None or stock_list.empty:
-                print("获取股票列表失败: 返回数据为空")
+                logger.warning("获取股票列表失败: 返回数据为空")
                 return pd.DataFrame()
             
             # 选择需要的列（包含更多字段以支持策略分析）
@@ -292,38 +522,76 @@ class StockDataFetcher:
                             '市盈率-动态', '总市值', '流通市值', '成交量',
                             '今开', '最高', '最低', '振幅', '量比']
             
-            # 只选择存在的列
+            # 只选择存在的列，按列引用原数据，不复制整块数据
+            # 浮点列保持 float64: 涨跌幅等与筛选边界（如 1.3）比较，float32 会把 1.3 变成 1.2999999
             available_columns = [c for c in columns_needed if c in stock_list.columns]
-            result = stock_list[available_columns]
+            result = self._downcast(pd.DataFrame(
+                {c: stock_list[c] for c in available_columns}, copy=False), downcast_float=False)
             
             # 更新缓存
             self._stock_list_cache = result
             self._stock_list_cache_time = datetime.now()
             
+            # 盘中行情实时变化，只缓存一个内存周期；收盘后可缓存到下一个交易时段
+            disk_ttl = seconds_until_next_session() or self._cache_ttl
+            self._list_disk_cache.set('spot', result, ttl=disk_ttl)
+            
             return result
             
         except Exception as e:
-            print(f"获取股票列表失败: {e}")
+            logger.warning("获取股票列表失败: %s", e)
             return pd.DataFrame()
     
+    def screenable_codes(self) -> np.ndarray:
+        """
+        可参与选股的股票代码: 排除科创板(688开头)和ST股票，顺序与股票列表一致
+        
+        过滤结果随股票列表缓存，股票列表未刷新时直接返回上次的结果
+        
+        Returns:
+            ndarray: 股票代码数组（定长字符串）
+        """
+        stock_list = self.get_stock_list()
+        cached = self._screenable_cache
+        if cached is not None and cached[0] is stock_list:
+            return cached[1]
+        if stock_list.empty:
+            return np.array([], dtype='U6')
+        
+        # 定长字符串数组上的向量化比较，不经过逐元素的 Python 字符串方法
+        codes = stock_list['代码'].to_numpy(dtype=str)
+        names = stock_list['名称'].fillna('').to_numpy(dtype=str)
+        keep = ~np.char.startswith(codes, '688') & (np.char.find(names, 'ST') < 0)
+        result = codes[keep]
+        self._screenable_cache = (stock_list, result)
+        return result
+    
     @retry_request(max_retries=3, delay=0.5, backoff=1.5)
     def _fetch_stock_hist_raw(self, symbol: str, period: str, 
                                start_date: str, end_date: str, adjust: str) -> pd.DataFrame:
-        """获取原始历史数据（带重试）"""
-        return ak.stock_zh_a_hist(
-            symbol=symbol,
-            period=period,
-            start_date=start_date,
-            end_date=end_date,
-            adjust=adjust
-        )
+        """获取原始历史数据（带重试）: 优先用长连接直接请求K线接口，失败时使用 AKShare"""
+        with _hist_semaphore:
+            try:
+                return fetch_kline(symbol, start_date, end_date, period, adjust)
+            except TRANSIENT_ERRORS + (ValueError, KeyError) as e:
+                # 网络错误或返回格式无法解析时改用 AKShare；其余异常属于程序错误，直接抛出
+                logger.debug("直连K线接口失败 %s: %s", symbol, e)
+            KLINE_RATE_LIMIT.acquire()
+            return ak.stock_zh_a_hist(
+                symbol=symbol,
+                period=period,
+                start_date=start_date,
+                end_date=end_date,
+                adjust=adjust
+            )
     
     def get_stock_hist(self, 
                        symbol: str, 
                        start_date: Optional[str] = None,
                        end_date: Optional[str] = None,
                        period: str = "daily",
-                       adjust: str = "qfq") -> pd.DataFrame:
+                       adjust: str = "qfq",
+                       dtype_backend: Optional[str] = None) -> pd.DataFrame:
         """
         获取股票历史数据
         
@@ -333,30 +601,284 @@ class StockDataFetcher:
             end_date: 结束日期 (格式: "20241231")
             period: 周期 ("daily", "weekly", "monthly")
             adjust: 复权类型 ("qfq"前复权, "hfq"后复权, ""不复权)
+            dtype_backend: 列存储后端，None 为 numpy；"pyarrow" 返回 Arrow 列（需安装 pyarrow）
         
         Returns:
             DataFrame: 历史行情数据
         """
-        if not end_date:
-            end_date = datetime.now().strftime("%Y%m%d")
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=365)).strftime("%Y%m%d")
+        start_date, end_date = _resolve_date_range(start_date, end_date)
+        
+        # 已结束的历史区间数据不会再变化，永久缓存；包含今天的区间见 _hist_ttl
+        cache_key = self._hist_cache_key(symbol, start_date, end_date, period, adjust)
+        cached = self._hist_disk_cache.get(cache_key)
+        if cached is not None:
+            return self._apply_dtype_backend(cached, dtype_backend)
         
         try:
-            df = self._fetch_stock_hist_raw(symbol, period, start_date, end_date, adjust)
+            df = self._fetch_hist_incremental(symbol, start_date, end_date, period, adjust)
             
             if df is None or df.empty:
                 return pd.DataFrame()
             
-            df['日期'] = pd.to_datetime(df['日期'])
-            df = df.sort_values('日期')
-            df.reset_index(drop=True, inplace=True)
+            self._save_hist(cache_key, df, end_date)
             
-            return df
+            return self._apply_dtype_backend(df, dtype_backend)
         except Exception as e:
-            # 静默处理，避免打印过多错误
+            logger.warning("获取股票 %s 历史数据失败: %s", symbol, e)
             return pd.DataFrame()
     
+    def _fetch_hist_incremental(self, symbol: str, start_date: str, end_date: str,
+                                period: str, adjust: str) -> Optional[pd.DataFrame]:
+        """
+        增量获取历史行情
+        
+        每只股票(按 周期+复权类型)在磁盘上保存一份已收盘的K线序列，
+        已覆盖请求起始日期时只请求最后保存日期之后的数据并追加；
+        新数据与已保存的最后一根K线收盘价不一致时(除权后复权价格整体变化)，丢弃旧序列重新全量获取
+        
+        Returns:
+            DataFrame: [start_date, end_date] 区间的历史行情；获取失败返回 None
+        """
+        store_key = f"{symbol}|{period}|{adjust}"
+        start_ts, end_ts = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        
+        stored = self._hist_store.get(store_key)
+        stored_start = stored.attrs.get('start') if stored is not None else None
+        df = None
+        if stored_start is not None and stored_start <= start_date and not stored.empty:
+            last_date = stored['日期'].iloc[-1]
+            if last_date >= end_ts:
+                df = stored
+            else:
+                # 从最后保存的日期开始请求，重叠的一根K线用于校验复权价格是否变化
+                delta = self._normalize_hist(self._fetch_stock_hist_raw(
+                    symbol, period, last_date.strftime("%Y%m%d"), end_date, adjust))
+                if delta is not None:
+                    overlap = delta.loc[delta['日期'] == last_date, '收盘'].to_numpy()
+                    if overlap.size and np.isclose(overlap[0], stored['收盘'].iloc[-1]):
+                        df = pd.concat([stored[stored['日期'] < last_date], delta], ignore_index=True)
+                        df.attrs['start'] = stored_start
+        
+        if df is None:
+            df = self._normalize_hist(
+                self._fetch_stock_hist_raw(symbol, period, start_date, end_date, adjust))
+            if df is None:
+                return None
+            df.attrs['start'] = start_date
+        
+        if df is not stored:
+            df = self._downcast(df, downcast_float=False)
+            # 只保存已收盘的K线，当日K线下次增量请求时重新获取
+            closed = df[df['日期'] < pd.Timestamp(date.today())].reset_index(drop=True)
+            closed.attrs['start'] = df.attrs.get('start', start_date)
+            if not closed.empty:
+                self._hist_store.set(store_key, closed)
+        
+        lo = df['日期'].searchsorted(start_ts)
+        hi = df['日期'].searchsorted(end_ts, side='right')
+        return df.iloc[lo:hi].reset_index(drop=True)
+    
+    @staticmethod
+    def _normalize_hist(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """日期转为 datetime64 并升序排列；空数据返回 None"""
+        if df is None or df.empty:
+            return None
+        df = df.copy()
+        df['日期'] = pd.to_datetime(df['日期'])
+        return df.sort_values('日期').reset_index(drop=True)
+    
+    @staticmethod
+    def _hist_cache_key(symbol: str, start_date: str, end_date: str,
+                        period: str, adjust: str) -> str:
+        """历史行情磁盘缓存键"""
+        return f"{symbol}|{start_date}|{end_date}|{period}|{adjust}"
+    
+    @staticmethod
+    def _hist_ttl(end_date: str, now: Optional[datetime] = None) -> Optional[float]:
+        """
+        历史行情缓存有效期
+        
+        结束日期早于今天的区间不会再变化，永久有效；包含今天的区间:
+        收盘后当日K线已确定，有效到下一个交易时段；盘中最多 HIST_INTRADAY_TTL 秒，
+        且在收盘时刻失效，收盘后第一次请求拿到的是完整的当日K线
+        
+        Args:
+            end_date: 结束日期 (格式: "20241231")
+            now: 当前时间，默认取系统时间
+            
+        Returns:
+            float: 有效期（秒），None 表示永久有效
+        """
+        now = now or datetime.now()
+        if end_date < now.strftime("%Y%m%d"):
+            return None
+        wait = seconds_until_next_session(now)
+        if wait:
+            return wait
+        session_end = now.replace(hour=15, minute=0, second=0, microsecond=0)
+        return min(HIST_INTRADAY_TTL, (session_end - now).total_seconds())
+    
+    def _save_hist(self, cache_key: str, df: pd.DataFrame, end_date: str):
+        """写入历史行情磁盘缓存"""
+        self._hist_disk_cache.set(cache_key, df, ttl=self._hist_ttl(end_date))
+    
+    def iter_stock_hist(self,
+                        symbols: List[str],
+                        start_date: Optional[str] = None,
+                        end_date: Optional[str] = None,
+                        period: str = "daily",
+                        adjust: str = "qfq",
+                        max_workers: int = 10,
+                        concurrency: int = 50) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        批量获取股票历史数据，按完成顺序逐只产出
+        
+        磁盘缓存命中的股票先产出；未命中的由后台线程并发请求(安装了 aiohttp 时用异步连接池，
+        否则使用线程池)，每完成一只放入有界队列，调用方可以边下载边处理
+        
+        Args:
+            symbols: 股票代码列表
+            start_date: 开始日期 (格式: "20240101")
+            end_date: 结束日期 (格式: "20241231")
+            period: 周期 ("daily", "weekly", "monthly")
+            adjust: 复权类型 ("qfq"前复权, "hfq"后复权, ""不复权)
+            max_workers: 线程池回退时的线程数
+            concurrency: 异步请求的最大并发数
+            
+        Yields:
+            (股票代码, DataFrame)，获取失败的股票对应空 DataFrame
+        """
+        start_date, end_date = _resolve_date_range(start_date, end_date)
+        
+        missing = []
+        for symbol in symbols:
+            cached = self._hist_disk_cache.get(
+                self._hist_cache_key(symbol, start_date, end_date, period, adjust)
+            )
+            if cached is not None:
+                yield symbol, cached
+            else:
+                missing.append(symbol)
+        
+        if not missing:
+            return
+        
+        # 生产者: 后台线程负责网络请求；有界队列在消费方处理较慢时对下载形成反压
+        # 队列元素为 (代码, DataFrame, 是否需要由消费方转换类型并写入缓存)
+        results = queue.Queue(maxsize=2 * max_workers)
+        
+        def on_fetched(symbol: str, df: pd.DataFrame):
+            # 异步请求的结果只入队，类型转换和写缓存放到消费方，回调不做耗时操作
+            results.put((symbol, df, True))
+        
+        def produce():
+            try:
+                if HAS_AIOHTTP:
+                    fetch_each_sync(missing, start_date, end_date, on_fetched,
+                                    period, adjust, concurrency)
+                else:
+                    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                        futures = {
+                            executor.submit(self.get_stock_hist, symbol, start_date,
+                                            end_date, period, adjust): symbol
+                            for symbol in missing
+                        }
+                        for future in as_completed(futures):
+                            symbol = futures[future]
+                            results.put((symbol, _future_frame(future, symbol), False))
+            finally:
+                results.put(None)
+        
+        threading.Thread(target=produce, daemon=True).start()
+        
+        # 消费者: 逐个取出已完成的结果
+        while True:
+            item = results.get()
+            if item is None:
+                break
+            symbol, df, needs_store = item
+            if needs_store and not df.empty:
+                df = self._downcast(df, downcast_float=False)
+                cache_key = self._hist_cache_key(symbol, start_date, end_date, period, adjust)
+                self._save_hist(cache_key, df, end_date)
+            yield symbol, df
+    
+    def get_stock_hist_many(self,
+                            symbols: List[str],
+                            start_date: Optional[str] = None,
+                            end_date: Optional[str] = None,
+                            period: str = "daily",
+                            adjust: str = "qfq",
+                            max_workers: int = 10,
+                            concurrency: int = 50) -> dict:
+        """
+        批量获取股票历史数据
+        
+        Args:
+            symbols: 股票代码列表
+            start_date: 开始日期 (格式: "20240101")
+            end_date: 结束日期 (格式: "20241231")
+            period: 周期 ("daily", "weekly", "monthly")
+            adjust: 复权类型 ("qfq"前复权, "hfq"后复权, ""不复权)
+            max_workers: 线程池回退时的线程数
+            concurrency: 异步请求的最大并发数
+            
+        Returns:
+            dict: {股票代码: DataFrame}，获取失败的股票对应空 DataFrame
+        """
+        result = dict(self.iter_stock_hist(symbols, start_date, end_date, period, adjust,
+                                           max_workers, concurrency))
+        # 按输入顺序返回
+        return {symbol: result[symbol] for symbol in symbols}
+    
+    @staticmethod
+    def _downcast(df: pd.DataFrame, downcast_float: bool = True) -> pd.DataFrame:
+        """
+        压缩列类型以减少内存和缓存体积
+        
+        - 浮点列 -> float32（downcast_float=False 时保持 float64）
+        - 整数列 -> 能容纳取值的最小整型
+        - 代码 -> category（名称保持原类型: 可能含缺失值，调用方会用 fillna('') 补空）
+        - 日期 -> datetime64
+        
+        Args:
+            df: 原始数据
+            downcast_float: 是否把浮点列降为 float32
+        
+        Returns:
+            DataFrame: 转换后的数据
+        """
+        if df.empty:
+            return df
+        # 逐列转换后重新组装，不需要转换的列直接共享原数组，不整体复制
+        columns = {}
+        for col in df.columns:
+            series = df[col]
+            if col == '日期':
+                series = pd.to_datetime(series)
+            elif col in ('代码', '股票代码'):
+                series = series.astype('category')
+            elif pd.api.types.is_integer_dtype(series):
+                series = pd.to_numeric(series, downcast='integer')
+            elif downcast_float and pd.api.types.is_float_dtype(series):
+                series = pd.to_numeric(series, downcast='float')
+            columns[col] = series
+        return pd.DataFrame(columns, index=df.index, copy=False)
+    
+    @staticmethod
+    def _apply_dtype_backend(df: pd.DataFrame, dtype_backend: Optional[str]) -> pd.DataFrame:
+        """
+        转换数值列的存储后端
+        日期列保持 datetime64，保证 .dt 访问器行为不变；pyarrow 未安装时原样返回
+        """
+        if dtype_backend is None or (dtype_backend == 'pyarrow' and not _HAS_PYARROW):
+            return df
+        value_cols = df.columns.drop('日期', errors='ignore')
+        # 价格列可能恰好全为整数，保持浮点类型避免被转换为整型
+        converted = df[value_cols].convert_dtypes(convert_integer=False,
+                                                  dtype_backend=dtype_backend)
+        return df[['日期']].join(converted) if '日期' in df.columns else converted
+    
     def get_stock_realtime(self, symbol: str, use_cache: bool = True) -> dict:
         """
         获取股票实时行情 - 优化版
@@ -370,36 +892,93 @@ class StockDataFetcher:
         Returns:
             dict: 实时行情数据
         """
-        try:
-            # 优先使用缓存数据
-            if use_cache and self._stock_list_cache is not None:
-                if self._stock_list_cache_time:
-                    elapsed = (datetime.now() - self._stock_list_cache_time).total_seconds()
-                    if elapsed < self._cache_ttl:
-                        # 从缓存中查找
-                        stock_data = self._stock_list_cache[
-                            self._stock_list_cache['代码'] == symbol
-                        ]
-                        if not stock_data.empty:
-                            return stock_data.iloc[0].to_dict()
-            
-            # 缓存不可用，获取新数据（带重试）
-            df = self._fetch_stock_list_raw()
+        return self.get_stock_realtime_many([symbol], use_cache=use_cache).get(symbol, {})
+    
+    def get_stock_realtime_many(self, symbols: List[str], use_cache: bool = True) -> Dict[str, dict]:
+        """
+        批量获取多只股票实时行情
+        
+        缓存的全市场快照有效时直接查表；否则按批量行情接口每 100 只一次请求，
+        批量接口失败时再请求全市场快照并写入股票列表缓存
+        
+        Args:
+            symbols: 股票代码列表
+            use_cache: 是否使用缓存数据
             
-            if df is None or df.empty:
-                return {}
+        Returns:
+            dict: {股票代码: 实时行情数据}，找不到的股票不包含在内
+        """
+        try:
+            if use_cache:
+                snapshot = self._memory_stock_list()
+                if snapshot is not None and not snapshot.empty:
+                    return self._rows_by_code(snapshot, symbols)
             
-            stock_data = df[df['代码'] == symbol]
+            quotes = self.get_quotes_batch(symbols)
+            if not quotes.empty:
+                return dict(zip(quotes['代码'], quotes.to_dict('records')))
             
-            if stock_data.empty:
+            snapshot = self.get_stock_list(use_cache=use_cache)
+            if snapshot.empty:
                 return {}
-            
-            return stock_data.iloc[0].to_dict()
+            return self._rows_by_code(snapshot, symbols)
             
         except Exception as e:
             # 静默处理，避免打印过多错误信息
             return {}
     
+    def get_quotes_batch(self, symbols: List[str], batch_size: int = QUOTE_BATCH_SIZE) -> pd.DataFrame:
+        """
+        通过批量行情接口获取多只股票的最新行情
+        
+        每批最多 batch_size 只股票，N 只股票只需 ⌈N/batch_size⌉ 次请求
+        
+        Args:
+            symbols: 股票代码列表
+            batch_size: 每次请求的股票数
+            
+        Returns:
+            DataFrame: 最新行情，列名与 get_stock_list 一致；全部失败时返回空 DataFrame
+        """
+        frames = []
+        for i in range(0, len(symbols), batch_size):
+            try:
+                frames.append(self._fetch_quotes_raw(symbols[i:i + batch_size]))
+            except Exception as e:
+                logger.warning("批量获取行情失败: %s", e)
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+    
+    @retry_request(max_retries=3, delay=0.5, backoff=1.5)
+    def _fetch_quotes_raw(self, symbols: List[str]) -> pd.DataFrame:
+        """请求一批股票的最新行情（带重试）"""
+        return fetch_quotes(symbols)
+    
+    def _rows_by_code(self, snapshot: pd.DataFrame, symbols: List[str]) -> Dict[str, dict]:
+        """
+        取出指定股票的行数据
+        
+        代码 -> 行号 的索引每份快照只构建一次，快照对象变化（缓存刷新）时自动重建；
+        只转换被查询的行，安装了 pyarrow 时由 Arrow 在 C++ 中完成转换
+        """
+        index = self._realtime_index
+        if index is None or index[0] is not snapshot:
+            positions = dict(zip(snapshot['代码'].astype(str), range(len(snapshot))))
+            table = pa.Table.from_pandas(snapshot, preserve_index=False) if _HAS_PYARROW else None
+            index = (snapshot, positions, table)
+            self._realtime_index = index
+        _, positions, table = index
+        
+        found = [symbol for symbol in symbols if symbol in positions]
+        rows = [positions[symbol] for symbol in found]
+        if table is not None:
+            records = table.take(rows).to_pylist()
+        else:
+            records = snapshot.iloc[rows].to_dict('records')
+        return dict(zip(found, records))
+    
     def get_stock_info(self, symbol: str) -> dict:
         """
         获取股票基本信息
@@ -415,7 +994,7 @@ class StockDataFetcher:
             info = ak.stock_individual_info_em(symbol=symbol)
             return info.set_index('item')['value'].to_dict()
         except Exception as e:
-            print(f"获取股票 {symbol} 基本信息失败: {e}")
+            logger.warning("获取股票 %s 基本信息失败: %s", symbol, e)
             return {}
     
     def get_market_index(self, 
@@ -433,40 +1012,48 @@ class StockDataFetcher:
         Returns:
             DataFrame: 指数历史数据
         """
-        if not end_date:
-            end_date = datetime.now().strftime("%Y%m%d")
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=365)).strftime("%Y%m%d")
+        start_date, end_date = _resolve_date_range(start_date, end_date)
         
         try:
             df = ak.stock_zh_index_daily(symbol=f"sh{symbol}")
             df['date'] = pd.to_datetime(df['date'])
-            df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-            return df
+            df = df.sort_values('date', ignore_index=True)
+            # 日期已排序，二分查找区间边界后直接切片
+            lo = df['date'].searchsorted(pd.Timestamp(start_date))
+            hi = df['date'].searchsorted(pd.Timestamp(end_date), side='right')
+            return df.iloc[lo:hi]
         except Exception as e:
-            print(f"获取指数 {symbol} 数据失败: {e}")
+            logger.warning("获取指数 %s 数据失败: %s", symbol, e)
             return pd.DataFrame()
     
-    def batch_get_stocks(self, symbols: List[str], **kwargs) -> dict:
+    def batch_get_stocks(self, symbols: List[str], max_workers: int = 16, **kwargs) -> dict:
         """
         批量获取股票数据
         
+        通过 iter_stock_hist 并发获取（安装了 aiohttp 时为单事件循环 + 连接池，否则为线程池），
+        不再逐只串行请求
+        
         Args:
             symbols: 股票代码列表
+            max_workers: 线程池回退时的线程数
             **kwargs: 传递给 get_stock_hist 的参数
+                      (start_date, end_date, period, adjust, dtype_backend)
             
         Returns:
-            dict: {股票代码: DataFrame}
+            dict: {股票代码: DataFrame}，只包含获取成功的股票，按输入顺序
         """
-        result = {}
-        for symbol in symbols:
-            print(f"正在获取 {symbol} 数据...")
-            df = self.get_stock_hist(symbol, **kwargs)
-            if not df.empty:
-                result[symbol] = df
-            time.sleep(0.5)  # 避免请求过快
+        dtype_backend = kwargs.pop('dtype_backend', None)
+        max_workers = max(1, min(max_workers, len(symbols)))
         
-        return result
+        frames = {}
+        for symbol, df in self.iter_stock_hist(symbols, max_workers=max_workers, **kwargs):
+            frames[symbol] = df
+            logger.info("正在获取股票数据 %d/%d (%s)", len(frames), len(symbols), symbol)
+        
+        return {
+            symbol: self._apply_dtype_backend(frames[symbol], dtype_backend)
+            for symbol in symbols if not frames[symbol].empty
+        }
     
     def get_concept_stocks(self, concept_name: str) -> pd.DataFrame:
         """
@@ -483,5 +1070,50 @@ class StockDataFetcher:
             df = ak.stock_board_concept_cons_em(symbol=concept_name)
             return df
         except Exception as e:
-            print(f"获取概念 {concept_name} 成分股失败: {e}")
+            logger.warning("获取概念 %s 成分股失败: %s", concept_name, e)
             return pd.DataFrame()
+
+
+def _future_frame(future: Future, symbol: str) -> pd.DataFrame:
+    """
+    取出单只股票历史数据任务的结果，任务出错时记录日志并返回空 DataFrame
+    
+    Args:
+        future: 已完成的任务
+        symbol: 股票代码
+        
+    Returns:
+        DataFrame: 历史数据，失败时为空
+    """
+    try:
+        return future.result()
+    except Exception as e:
+        logger.warning("获取股票 %s 历史数据失败: %s", symbol, e)
+        return pd.DataFrame()
+
+
+# 进程内共享的股票列表缓存: (写入时间戳, DataFrame)
+_LIST_CACHE: Optional[tuple] = None
+_list_cache_lock = threading.Lock()
+
+
+def get_stock_list_cached(ttl: float = STOCK_LIST_TTL) -> pd.DataFrame:
+    """
+    获取股票列表（进程内共享缓存）
+    多个模块各自创建 StockDataFetcher 时，避免重复拉取全市场列表
+    
+    Args:
+        ttl: 缓存有效期（秒）
+        
+    Returns:
+        DataFrame: 股票列表
+    """
+    global _LIST_CACHE
+    with _list_cache_lock:
+        if _LIST_CACHE is not None and time.time() - _LIST_CACHE[0] < ttl:
+            return _LIST_CACHE[1]
+        
+        df = StockDataFetcher().get_stock_list()
+        if not df.empty:
+            _LIST_CACHE = (time.time(), df)
+        return df
@@ -0,0 +1,321 @@
+"""
+东方财富行情接口
+直接请求 push2his K线接口时使用的参数构造和解析，与 AKShare stock_zh_a_hist 返回格式一致；
+push2 批量行情接口一次请求返回多只股票的最新行情，列名与 AKShare stock_zh_a_spot_em 一致
+
+同步请求使用 EMConnector: 每个线程对每个主机保持一条 http.client 长连接，
+省去 requests/urllib3 每次请求的 URL 解析和连接池查找；
+被限流时按服务端的 Retry-After 暂停限速器，而不是固定间隔等待
+"""
+import http.client
+import io
+import json
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlencode
+
+import pandas as pd
+
+from src.rate_limit import TokenBucket
+
+try:
+    import pyarrow  # noqa: F401
+    _CSV_ENGINE = 'pyarrow'
+except ImportError:
+    _CSV_ENGINE = 'c'
+
+# JSON 解析: 优先使用 orjson，未安装时使用标准库
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+
+KLINE_HOST = "push2his.eastmoney.com"
+KLINE_PATH = "/api/qt/stock/kline/get"
+KLINE_URL = f"https://{KLINE_HOST}{KLINE_PATH}"
+
+# K线接口限速（同步和异步请求共用）
+KLINE_RATE_LIMIT = TokenBucket(rate=20, capacity=20)
+
+# 周期 -> klt 参数
+PERIOD_KLT = {'daily': '101', 'weekly': '102', 'monthly': '103'}
+
+# 复权类型 -> fqt 参数
+ADJUST_FQT = {'qfq': '1', 'hfq': '2', '': '0'}
+
+# f51-f61 对应的列名
+KLINE_COLUMNS = ['日期', '开盘', '收盘', '最高', '最低', '成交量', '成交额',
+                 '振幅', '涨跌幅', '涨跌额', '换手率']
+
+QUOTE_HOST = "push2.eastmoney.com"
+QUOTE_PATH = "/api/qt/ulist.np/get"
+
+# 批量行情接口每次请求的股票数上限
+QUOTE_BATCH_SIZE = 100
+
+# 批量行情字段 -> 列名
+QUOTE_FIELDS = {
+    'f12': '代码', 'f14': '名称', 'f2': '最新价', 'f3': '涨跌幅', 'f4': '涨跌额',
+    'f5': '成交量', 'f6': '成交额', 'f7': '振幅', 'f8': '换手率', 'f9': '市盈率-动态',
+    'f10': '量比', 'f15': '最高', 'f16': '最低', 'f17': '今开', 'f18': '昨收',
+    'f20': '总市值', 'f21': '流通市值', 'f23': '市净率',
+}
+
+# 被限流(HTTP 429/503)且响应未给出 Retry-After 时的暂停秒数
+RATE_LIMITED_PAUSE = 2.0
+
+# 除成交量外均按浮点解析，避免价格恰好都是整数时被推断为整型
+KLINE_FLOAT_DTYPES = {col: 'float64' for col in KLINE_COLUMNS[1:] if col != '成交量'}
+
+
+def secid(symbol: str) -> str:
+    """
+    东方财富证券ID: 沪市(6开头)为 1.代码，深市为 0.代码
+
+    Args:
+        symbol: 股票代码
+
+    Returns:
+        str: secid
+    """
+    return f"1.{symbol}" if symbol.startswith('6') else f"0.{symbol}"
+
+
+def kline_params(symbol: str, start_date: str, end_date: str,
+                 period: str = "daily", adjust: str = "qfq") -> dict:
+    """
+    构造K线接口请求参数
+
+    Args:
+        symbol: 股票代码
+        start_date: 开始日期 (格式: "20240101")
+        end_date: 结束日期 (格式: "20241231")
+        period: 周期 ("daily", "weekly", "monthly")
+        adjust: 复权类型 ("qfq", "hfq", "")
+
+    Returns:
+        dict: 请求参数
+    """
+    return {
+        'fields1': 'f1,f2,f3,f4,f5,f6',
+        'fields2': 'f51,f52,f53,f54,f55,f56,f57,f58,f59,f60,f61',
+        'ut': '7eea3edcaed734bea9cbfc24409ed989',
+        'klt': PERIOD_KLT[period],
+        'fqt': ADJUST_FQT[adjust],
+        'secid': secid(symbol),
+        'beg': start_date,
+        'end': end_date,
+    }
+
+
+def parse_kline(payload: Optional[dict], symbol: str) -> pd.DataFrame:
+    """
+    解析K线接口返回的 JSON
+
+    Args:
+        payload: 接口返回的 JSON 对象
+        symbol: 股票代码
+
+    Returns:
+        DataFrame: 历史行情，日期升序；无数据时返回空 DataFrame
+    """
+    data = (payload or {}).get('data') or {}
+    klines = data.get('klines')
+    if not klines:
+        return pd.DataFrame()
+
+    # 每条K线是一行逗号分隔文本，拼接后交给 CSV 解析器一次完成拆分和类型转换
+    # 安装了 pyarrow 时使用多线程的 Arrow 解析器
+    df = pd.read_csv(io.StringIO('\n'.join(klines)), header=None, names=KLINE_COLUMNS,
+                     parse_dates=['日期'], dtype=KLINE_FLOAT_DTYPES, na_values=['-'],
+                     engine=_CSV_ENGINE)
+    df.insert(1, '股票代码', symbol)
+    return df
+
+
+def quote_params(symbols) -> dict:
+    """
+    构造批量行情接口请求参数
+
+    Args:
+        symbols: 股票代码列表（不超过 QUOTE_BATCH_SIZE 只）
+
+    Returns:
+        dict: 请求参数
+    """
+    return {
+        'fltt': '2',
+        'invt': '2',
+        'fields': ','.join(QUOTE_FIELDS),
+        'secids': ','.join(secid(symbol) for symbol in symbols),
+        'ut': 'bd1d9ddb04089700cf9c27f6f7426281',
+    }
+
+
+def parse_quotes(payload: Optional[dict]) -> pd.DataFrame:
+    """
+    解析批量行情接口返回的 JSON
+
+    Args:
+        payload: 接口返回的 JSON 对象
+
+    Returns:
+        DataFrame: 最新行情，每只股票一行；无数据时返回空 DataFrame
+    """
+    data = (payload or {}).get('data') or {}
+    diff = data.get('diff')
+    if not diff:
+        return pd.DataFrame()
+    # diff 可能是列表，也可能是以序号为键的对象
+    if isinstance(diff, dict):
+        diff = list(diff.values())
+
+    df = pd.DataFrame.from_records(diff, columns=list(QUOTE_FIELDS)).rename(columns=QUOTE_FIELDS)
+    df['代码'] = df['代码'].astype(str)
+    # 停牌等情况下字段值为 "-"
+    value_cols = df.columns.drop(['代码', '名称'])
+    df[value_cols] = df[value_cols].apply(pd.to_numeric, errors='coerce')
+    return df
+
+
+class RateLimited(http.client.HTTPException):
+    """服务端限流(HTTP 429/503)，retry_after 为服务端要求等待的秒数"""
+
+    def __init__(self, status: int, retry_after: float):
+        super().__init__(f"HTTP {status}")
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> float:
+    """
+    解析 Retry-After 响应头
+
+    Args:
+        value: 秒数或 HTTP 日期；为 None 或无法解析时使用 RATE_LIMITED_PAUSE
+
+    Returns:
+        float: 需要等待的秒数
+    """
+    if not value:
+        return RATE_LIMITED_PAUSE
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return RATE_LIMITED_PAUSE
+
+
+class EMConnector:
+    """
+    东方财富 HTTPS 长连接
+    http.client 连接不是线程安全的，每个线程各持有一条连接
+    """
+
+    # 连接被服务端关闭时重连一次
+    _RECONNECT_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                         ConnectionResetError, BrokenPipeError)
+
+    def __init__(self, host: str, timeout: float = 30):
+        """
+        Args:
+            host: 主机名
+            timeout: 超时时间（秒）
+        """
+        self.host = host
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPSConnection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = http.client.HTTPSConnection(self.host, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def get(self, path: str) -> bytes:
+        """
+        发送 GET 请求
+
+        Args:
+            path: 路径和查询字符串
+
+        Returns:
+            bytes: 响应内容
+        """
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request('GET', path, headers={'Connection': 'keep-alive'})
+                response = conn.getresponse()
+                body = response.read()
+            except self._RECONNECT_ERRORS:
+                self.close()
+                if attempt:
+                    raise
+                continue
+            except Exception:
+                self.close()
+                raise
+            if response.status in (429, 503):
+                raise RateLimited(response.status, parse_retry_after(response.getheader('Retry-After')))
+            if response.status != 200:
+                raise http.client.HTTPException(f"HTTP {response.status}")
+            return body
+
+
+_kline_connector = EMConnector(KLINE_HOST)
+_quote_connector = EMConnector(QUOTE_HOST)
+
+
+def fetch_kline(symbol: str, start_date: str, end_date: str,
+                period: str = "daily", adjust: str = "qfq") -> pd.DataFrame:
+    """
+    通过长连接直接请求K线接口
+
+    Args:
+        symbol: 股票代码
+        start_date: 开始日期 (格式: "20240101")
+        end_date: 结束日期 (格式: "20241231")
+        period: 周期 ("daily", "weekly", "monthly")
+        adjust: 复权类型 ("qfq", "hfq", "")
+
+    Returns:
+        DataFrame: 历史行情；无数据时返回空 DataFrame
+    """
+    params = kline_params(symbol, start_date, end_date, period, adjust)
+    KLINE_RATE_LIMIT.acquire()
+    try:
+        body = _kline_connector.get(f"{KLINE_PATH}?{urlencode(params)}")
+    except RateLimited as e:
+        # 被限流时暂停共用的限速器，所有线程的后续请求（包括重试）都等到 Retry-After 之后
+        KLINE_RATE_LIMIT.pause(e.retry_after)
+        raise
+    return parse_kline(json_loads(body), symbol)
+
+
+def fetch_quotes(symbols) -> pd.DataFrame:
+    """
+    通过长连接请求一批股票的最新行情
+
+    Args:
+        symbols: 股票代码列表（不超过 QUOTE_BATCH_SIZE 只）
+
+    Returns:
+        DataFrame: 最新行情；无数据时返回空 DataFrame
+    """
+    body = _quote_connector.get(f"{QUOTE_PATH}?{urlencode(quote_params(symbols))}")
+    return parse_quotes(json_loads(body))
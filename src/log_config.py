@@ -0,0 +1,41 @@
+"""
+日志配置
+src 包内各模块通过 logging.getLogger(__name__) 输出状态信息，默认只显示警告和错误
+
+日志记录经 QueueHandler 放入队列，由 QueueListener 的单独线程写出，
+线程池中的工作线程只需入队，不会在输出流的锁上互相等待
+"""
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# verbose 次数 -> 日志级别
+VERBOSE_LEVELS = {0: logging.WARNING, 1: logging.INFO}
+
+_listener = None
+
+
+def setup_logging(verbose: int = 0):
+    """
+    配置 src 包的日志输出，重复调用时只更新日志级别
+
+    Args:
+        verbose: 详细程度，0 只显示警告和错误，1 显示运行信息，2 及以上显示调试信息
+    """
+    global _listener
+    logger = logging.getLogger('src')
+    logger.setLevel(VERBOSE_LEVELS.get(verbose, logging.DEBUG))
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    _listener = QueueListener(log_queue, handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    logger.addHandler(QueueHandler(log_queue))
+    logger.propagate = False
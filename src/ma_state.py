@@ -0,0 +1,175 @@
+"""
+均线状态存储模块
+在磁盘上保存每只股票最近 N 个交易日的收盘价，筛选时只需用实时快照补上当日收盘价，
+即可计算 MA5/MA20 及金叉，无需逐只拉取历史行情
+
+存储格式(宽表): index=代码, columns=交易日(YYYYMMDD, 升序), 值=收盘价
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.cache import FileCache
+
+
+# 保存的交易日数: MA20 + 最近数日的交叉判断
+STATE_DAYS = 30
+
+_state_cache = FileCache('ma_state')
+_STATE_KEY = 'closes'
+
+
+def latest_session_date(now: Optional[datetime] = None) -> np.datetime64:
+    """
+    最近一个已开盘的交易日（工作日近似，不考虑节假日）
+    开盘(9:30)前实时快照仍是上一交易日的价格，因此按上一交易日计
+
+    Args:
+        now: 当前时间，默认为系统时间
+
+    Returns:
+        datetime64[D]: 交易日
+    """
+    now = now or datetime.now()
+    day = now.date()
+    if now.hour * 60 + now.minute < 9 * 60 + 30:
+        day -= timedelta(days=1)
+    return np.busday_offset(np.datetime64(day, 'D'), 0, roll='backward')
+
+
+def load_state() -> Optional[pd.DataFrame]:
+    """
+    读取收盘价状态
+
+    Returns:
+        DataFrame: 宽表收盘价；不存在时返回 None
+    """
+    state = _state_cache.get(_STATE_KEY)
+    if state is None or state.empty:
+        return None
+    return state
+
+
+def save_state(closes: pd.DataFrame):
+    """
+    合并并保存收盘价状态，每只股票只保留最近 STATE_DAYS 个交易日
+
+    Args:
+        closes: 长表 [symbol, 日期, 收盘]
+    """
+    wide = closes.pivot_table(index='symbol', columns='日期', values='收盘', aggfunc='last')
+    wide.columns = pd.DatetimeIndex(wide.columns).strftime('%Y%m%d')
+
+    # 收盘前的当日K线价格仍会变化，不写入状态
+    now = datetime.now()
+    if now.hour < 15:
+        wide = wide.loc[:, wide.columns < now.strftime('%Y%m%d')]
+
+    old = load_state()
+    if old is not None:
+        # 新数据覆盖旧数据，保留其它股票的状态
+        wide = wide.combine_first(old)
+    wide = wide.reindex(columns=sorted(wide.columns)).iloc[:, -STATE_DAYS:]
+    wide.index.name = '代码'
+    _state_cache.set(_STATE_KEY, wide)
+
+
+def update_state(symbols: Optional[Iterable[str]] = None,
+                 max_workers: int = 10) -> Optional[pd.DataFrame]:
+    """
+    全量刷新收盘价状态（建议每日收盘后运行一次）
+
+    Args:
+        symbols: 股票代码列表，默认为全市场
+        max_workers: 并行获取历史数据的线程数
+
+    Returns:
+        DataFrame: 刷新后的状态；获取失败返回 None
+    """
+    from src.data_fetcher import StockDataFetcher, get_stock_list_cached
+
+    fetcher = StockDataFetcher()
+    if symbols is None:
+        stock_list = get_stock_list_cached()
+        if stock_list.empty:
+            return None
+        symbols = stock_list['代码'].tolist()
+    symbols = list(symbols)
+
+    # 自然日按交易日数放宽，保证覆盖 STATE_DAYS 个交易日
+    end_date = datetime.now().strftime("%Y%m%d")
+    start_date = (datetime.now() - timedelta(days=STATE_DAYS * 2)).strftime("%Y%m%d")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        frames = list(executor.map(
+            lambda symbol: fetcher.get_stock_hist(symbol, start_date, end_date),
+            symbols
+        ))
+
+    save_state(closes_from_frames(dict(zip(symbols, frames))))
+    return load_state()
+
+
+def closes_from_frames(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    把各股票的历史行情合并为长表收盘价
+
+    Args:
+        frames: {代码: 历史行情}
+
+    Returns:
+        DataFrame: 长表 [symbol, 日期, 收盘]
+    """
+    valid = {symbol: df[['日期', '收盘']] for symbol, df in frames.items() if not df.empty}
+    if not valid:
+        return pd.DataFrame(columns=['symbol', '日期', '收盘'])
+    return pd.concat(
+        valid.values(), keys=valid.keys(), names=['symbol', None]
+    ).reset_index(level='symbol').reset_index(drop=True)
+
+
+def recent_closes(stock_list: pd.DataFrame,
+                  now: Optional[datetime] = None) -> Optional[pd.DataFrame]:
+    """
+    用磁盘状态 + 实时快照拼出最近收盘价
+
+    状态需覆盖 stock_list 中所有股票，且每只股票都有最晚日期（不早于上一交易日）的收盘价，
+    否则返回 None，由调用方回退到逐只获取历史行情
+
+    Args:
+        stock_list: 包含 代码、最新价 的实时快照
+        now: 当前时间，默认为系统时间
+
+    Returns:
+        DataFrame: 长表 [symbol, 日期, 收盘]，已按 symbol、日期 排序
+    """
+    state = load_state()
+    if state is None:
+        return None
+
+    symbols = stock_list['代码'].to_numpy()
+    if not np.isin(symbols, state.index.to_numpy()).all():
+        return None
+
+    session = latest_session_date(now)
+    last_date = np.datetime64(pd.Timestamp(state.columns[-1]).date(), 'D')
+    gap = np.busday_count(last_date, session)
+    if gap > 1:
+        # 状态缺失了中间的交易日
+        return None
+
+    wide = state.loc[symbols]
+    if not wide.iloc[:, -1].notna().all():
+        # 部分股票只在更早的交易日保存过，序列中间会有缺口
+        return None
+    if gap == 1:
+        # 当日收盘价取自实时快照
+        today_close = stock_list.set_index('代码')['最新价'].reindex(symbols).to_numpy(dtype=float)
+        wide = wide.assign(**{pd.Timestamp(session).strftime('%Y%m%d'): today_close})
+
+    long = (wide.rename_axis(index='symbol', columns='日期')
+            .stack().dropna().rename('收盘').reset_index())
+    long['日期'] = pd.to_datetime(long['日期'], format='%Y%m%d')
+    return long
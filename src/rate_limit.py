@@ -0,0 +1,69 @@
+"""
+请求限速模块
+令牌桶: 按固定速率补充令牌，允许短时突发，超出速率时只等待到下一个令牌可用为止
+同一个限速器可同时用于线程和 asyncio 协程
+"""
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """线程安全的令牌桶限速器"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Args:
+            rate: 每秒补充的令牌数（即长期平均请求速率）
+            capacity: 桶容量（允许的突发请求数），默认等于 rate
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        预定一个令牌
+
+        令牌不足时余额记为负数，后来者依次排在后面
+
+        Returns:
+            float: 需要等待的秒数，0 表示可以立即请求
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """阻塞直到获得令牌"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """协程版本: 等待期间不阻塞事件循环"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """
+        暂停发放令牌，用于服务端要求降速时（如 HTTP 429 的 Retry-After）
+
+        令牌余额记为至少 -seconds*rate，之后所有请求都要排在暂停结束之后
+
+        Args:
+            seconds: 暂停的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens = min(self._tokens, -seconds * self.rate)
@@ -6,9 +6,16 @@ import pandas as pd
 import numpy as np
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
-import time
-from src.data_fetcher import StockDataFetcher
-from src.technical_analysis import TechnicalIndicators
+from src.cache import FileCache
+from src.data_fetcher import StockDataFetcher, seconds_until_next_session
+from src.ta_kernels import macd_kernel, rolling_mean
+
+
+# 盘中特征缓存有效期（秒）: 特征含实时换手率和市盈率，与股票列表缓存周期一致
+FEATURE_CACHE_TTL = 300
+
+# 特征矩阵的数据类型: 分数只需保留一位小数展示，float32 精度足够，内存和带宽减半
+_FEATURE_DTYPE = np.float32
 
 
 class SimilarStockFinder:
@@ -16,7 +23,99 @@ class SimilarStockFinder:
     
     def __init__(self):
         self.fetcher = StockDataFetcher()
+        # 单只股票的特征: 内存 LRU + 磁盘缓存，收盘后有效到下一个交易时段
+        self._feature_cache = FileCache('features')
         
+    # 参与相似度计算的特征，依次对应特征矩阵的各列
+    SCORE_FEATURES = ('ma_trend', 'macd', 'rsi', 'volatility', 'turnover', 'pe')
+    
+    # find_similar_stocks 返回结果的列
+    RESULT_COLUMNS = ('代码', '名称', '相似度', '最新价', '涨跌幅', '换手率', 'RSI', '趋势', '市盈率')
+    
+    DEFAULT_WEIGHTS = {
+        'trend': 0.3,      # 趋势相似度权重
+        'momentum': 0.25,   # 动量相似度权重
+        'volatility': 0.15, # 波动率相似度权重
+        'volume': 0.15,     # 成交量相似度权重
+        'valuation': 0.15   # 估值相似度权重
+    }
+    
+    @classmethod
+    def feature_matrix(cls, features_list: List[Dict]) -> np.ndarray:
+        """
+        特征字典列表 -> (N, F) 特征矩阵，列顺序见 SCORE_FEATURES，缺少的特征为 NaN
+        
+        Args:
+            features_list: 特征字典列表
+            
+        Returns:
+            ndarray: 特征矩阵
+        """
+        return np.array([[features.get(name, np.nan) for name in cls.SCORE_FEATURES]
+                         for features in features_list], dtype=_FEATURE_DTYPE).reshape(-1, len(cls.SCORE_FEATURES))
+    
+    @staticmethod
+    def score_matrix(target: np.ndarray,
+                     candidates: np.ndarray,
+                     weights: Dict = None,
+                     present: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        向量化计算目标股票与所有候选股票的相似度分数
+        
+        缺失(NaN)的特征不参与对应维度的计算，该维度得分为 0；
+        动量维度取 MACD、RSI 的平均分，分母按两只股票都带有的特征项计数，
+        值为 NaN 的特征项记 0 分但仍计入分母；计算保持特征矩阵的数据类型
+        
+        Args:
+            target: 目标股票特征向量，长度 F
+            candidates: 候选股票特征矩阵，形状 (N, F)
+            weights: 各维度的权重，默认 DEFAULT_WEIGHTS
+            present: 形状 (N, F) 的布尔矩阵，目标股票和候选股票的特征字典都含有该项时为 True；
+                     默认全部为 True（extract_stock_features 的结果总是含有 macd、rsi）
+            
+        Returns:
+            ndarray: 相似度分数(0-100,越高越相似)，长度 N
+        """
+        if weights is None:
+            weights = SimilarStockFinder.DEFAULT_WEIGHTS
+        
+        ma_trend, macd, rsi, volatility, turnover, pe = candidates.T
+        t_trend, t_macd, t_rsi, t_volatility, t_turnover, t_pe = target
+        
+        def ratio_score(a, b):
+            """两者较小值/较大值 * 100，无法计算时为 0"""
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = np.minimum(a, b) / np.maximum(a, b) * 100
+            return np.nan_to_num(ratio, nan=0.0, posinf=0.0, neginf=0.0)
+        
+        # 1. 趋势相似度(MA趋势方向)，fmax 把 NaN 视为 0 分
+        trend_score = np.fmax(0, 100 - np.abs(ma_trend - t_trend) * 10)
+        
+        # 2. 动量相似度(MACD, RSI)
+        macd_score = np.fmax(0, 100 - np.abs(macd - t_macd) * 50)
+        rsi_score = np.fmax(0, 100 - np.abs(rsi - t_rsi))
+        if present is None:
+            momentum_count = np.full(len(candidates), 2, dtype=candidates.dtype)
+        else:
+            momentum_count = present[:, 1].astype(candidates.dtype) + present[:, 2]
+        with np.errstate(invalid='ignore'):
+            momentum_score = np.where(momentum_count > 0,
+                                      (np.nan_to_num(macd_score) + np.nan_to_num(rsi_score)) / momentum_count,
+                                      0.0)
+        
+        # 3. 波动率相似度  4. 成交量相似度(换手率)
+        volatility_score = ratio_score(volatility, t_volatility)
+        volume_score = ratio_score(turnover, t_turnover)
+        
+        # 5. 估值相似度(市盈率)，两者均为正时才计算
+        valuation_score = np.where((pe > 0) & (t_pe > 0), ratio_score(pe, t_pe), 0.0)
+        
+        return (np.nan_to_num(trend_score) * weights['trend'] +
+                momentum_score * weights['momentum'] +
+                volatility_score * weights['volatility'] +
+                volume_score * weights['volume'] +
+                valuation_score * weights['valuation'])
+    
     def calculate_similarity_score(self, 
                                    target_features: Dict,
                                    candidate_features: Dict,
@@ -32,158 +131,217 @@ class SimilarStockFinder:
         Returns:
             float: 相似度分数(0-100,越高越相似)
         """
-        if weights is None:
-            weights = {
-                'trend': 0.3,      # 趋势相似度权重
-                'momentum': 0.25,   # 动量相似度权重
-                'volatility': 0.15, # 波动率相似度权重
-                'volume': 0.15,     # 成交量相似度权重
-                'valuation': 0.15   # 估值相似度权重
-            }
-        
-        total_score = 0
-        
-        # 1. 趋势相似度(MA趋势方向)
-        if 'ma_trend' in target_features and 'ma_trend' in candidate_features:
-            ma_diff = abs(target_features['ma_trend'] - candidate_features['ma_trend'])
-            trend_score = max(0, 100 - ma_diff * 10)
-            total_score += trend_score * weights['trend']
-        
-        # 2. 动量相似度(MACD, RSI)
-        momentum_score = 0
-        momentum_count = 0
-        
-        if 'macd' in target_features and 'macd' in candidate_features:
-            macd_diff = abs(target_features['macd'] - candidate_features['macd'])
-            momentum_score += max(0, 100 - macd_diff * 50)
-            momentum_count += 1
-        
-        if 'rsi' in target_features and 'rsi' in candidate_features:
-            rsi_diff = abs(target_features['rsi'] - candidate_features['rsi'])
-            momentum_score += max(0, 100 - rsi_diff)
-            momentum_count += 1
-        
-        if momentum_count > 0:
-            total_score += (momentum_score / momentum_count) * weights['momentum']
-        
-        # 3. 波动率相似度
-        if 'volatility' in target_features and 'volatility' in candidate_features:
-            vol_ratio = min(target_features['volatility'], candidate_features['volatility']) / \
-                       max(target_features['volatility'], candidate_features['volatility'])
-            volatility_score = vol_ratio * 100
-            total_score += volatility_score * weights['volatility']
-        
-        # 4. 成交量相似度(换手率)
-        if 'turnover' in target_features and 'turnover' in candidate_features:
-            turnover_ratio = min(target_features['turnover'], candidate_features['turnover']) / \
-                            max(target_features['turnover'], candidate_features['turnover'])
-            volume_score = turnover_ratio * 100
-            total_score += volume_score * weights['volume']
-        
-        # 5. 估值相似度(市盈率)
-        if 'pe' in target_features and 'pe' in candidate_features:
-            if target_features['pe'] > 0 and candidate_features['pe'] > 0:
-                pe_ratio = min(target_features['pe'], candidate_features['pe']) / \
-                          max(target_features['pe'], candidate_features['pe'])
-                valuation_score = pe_ratio * 100
-                total_score += valuation_score * weights['valuation']
-        
-        return total_score
+        target = self.feature_matrix([target_features])[0]
+        candidates = self.feature_matrix([candidate_features])
+        present = np.array([[name in target_features and name in candidate_features
+                             for name in self.SCORE_FEATURES]])
+        return float(self.score_matrix(target, candidates, weights, present)[0])
+    
+    @staticmethod
+    def _hist_range(days: int) -> Tuple[str, str]:
+        """特征提取所需的历史数据区间 (开始日期, 结束日期)"""
+        end_date = datetime.now().strftime("%Y%m%d")
+        start_date = (datetime.now() - timedelta(days=days + 120)).strftime("%Y%m%d")
+        return start_date, end_date
     
     def extract_stock_features(self, 
                               symbol: str,
-                              days: int = 60) -> Optional[Dict]:
+                              days: int = 60,
+                              hist: Optional[pd.DataFrame] = None) -> Optional[Dict]:
         """
         提取股票的特征向量
         
         Args:
             symbol: 股票代码
             days: 分析的天数
+            hist: 已获取的历史数据，为 None 时自动获取
             
         Returns:
             dict: 股票特征字典
         """
         try:
-            end_date = datetime.now().strftime("%Y%m%d")
-            start_date = (datetime.now() - timedelta(days=days + 120)).strftime("%Y%m%d")
-            
-            # 获取历史数据
-            df = self.fetcher.get_stock_hist(
-                symbol=symbol,
-                start_date=start_date,
-                end_date=end_date
-            )
-            
-            if df.empty or len(df) < 30:
-                return None
-            
-            # 计算技术指标
-            df = TechnicalIndicators.calculate_all_indicators(df)
-            
-            # 只取最近N天
-            df = df.tail(days)
-            
-            # 获取实时数据
-            realtime = self.fetcher.get_stock_realtime(symbol)
+            # 获取历史数据；自动获取时按 (股票, 结束日期, 天数) 缓存特征
+            end_date = None
+            if hist is None:
+                start_date, end_date = self._hist_range(days)
+                cached = self._cached_features([symbol], end_date, days)
+                if symbol in cached:
+                    return cached[symbol]
+                
+                hist = self.fetcher.get_stock_hist(
+                    symbol=symbol,
+                    start_date=start_date,
+                    end_date=end_date
+                )
             
-            # 提取特征
-            features = {}
+            features = self.extract_features_batch({symbol: hist}, days).get(symbol)
+            if features is not None and end_date is not None:
+                self._store_features({symbol: features}, end_date, days)
+            return features
             
-            # 1. 趋势特征
-            if 'MA5' in df.columns and 'MA20' in df.columns and 'MA60' in df.columns:
-                latest = df.iloc[-1]
-                # MA排列(多头排列为正值,空头排列为负值)
-                ma5_slope = (df['MA5'].iloc[-1] - df['MA5'].iloc[-5]) / df['MA5'].iloc[-5] * 100 if len(df) >= 5 else 0
-                ma20_slope = (df['MA20'].iloc[-1] - df['MA20'].iloc[-10]) / df['MA20'].iloc[-10] * 100 if len(df) >= 10 else 0
-                features['ma_trend'] = (ma5_slope + ma20_slope) / 2
+        except Exception as e:
+            print(f"提取 {symbol} 特征失败: {e}")
+            return None
+    
+    def _cached_features(self, symbols: List[str], end_date: str, days: int) -> Dict[str, Dict]:
+        """
+        读取已缓存的特征
+        
+        Args:
+            symbols: 股票代码列表
+            end_date: 历史数据结束日期
+            days: 分析的天数
             
-            # 2. 动量特征
-            if 'MACD' in df.columns:
-                features['macd'] = df['MACD'].iloc[-1]
+        Returns:
+            dict: {股票代码: 特征字典}，只包含缓存命中的股票
+        """
+        result = {}
+        for symbol in symbols:
+            cached = self._feature_cache.get(f"{symbol}_{end_date}_{days}")
+            if cached is not None:
+                result[symbol] = cached.iloc[0].to_dict()
+        return result
+    
+    def _store_features(self, features_by_symbol: Dict[str, Dict], end_date: str, days: int):
+        """
+        缓存特征: 盘中短期有效，收盘后有效到下一个交易时段
+        
+        Args:
+            features_by_symbol: {股票代码: 特征字典}
+            end_date: 历史数据结束日期
+            days: 分析的天数
+        """
+        ttl = seconds_until_next_session() or FEATURE_CACHE_TTL
+        for symbol, features in features_by_symbol.items():
+            self._feature_cache.set(f"{symbol}_{end_date}_{days}", pd.DataFrame([features]), ttl=ttl)
+    
+    def extract_features_batch(self,
+                               histories: Dict[str, pd.DataFrame],
+                               days: int = 60,
+                               realtime: Optional[Dict[str, dict]] = None) -> Dict[str, Dict]:
+        """
+        批量提取多只股票的特征向量
+        
+        各股票历史数据拼接为一张长表，按股票分组一次算出所需指标，
+        每只股票的特征取自分组后的最近N行；实时行情一次批量获取
+        
+        Args:
+            histories: {股票代码: 历史数据}
+            days: 分析的天数
+            realtime: {股票代码: 实时行情}，为 None 时批量获取
             
-            if 'RSI14' in df.columns:
-                features['rsi'] = df['RSI14'].iloc[-1]
+        Returns:
+            dict: {股票代码: 特征字典}，数据不足的股票不包含在内
+        """
+        frames = {symbol: df for symbol, df in histories.items() if len(df) >= 30}
+        if not frames:
+            return {}
+        if realtime is None:
+            realtime = self.fetcher.get_stock_realtime_many(list(frames))
+        
+        symbols = list(frames)
+        df = pd.concat(frames.values(), ignore_index=True)
+        lengths = [len(frames[symbol]) for symbol in symbols]
+        df['symbol'] = np.repeat(symbols, lengths)
+        # 缺少换手率列的股票拼接后该列为 NaN，按原逻辑视为 0
+        has_turnover = {symbol: '换手率' in frames[symbol].columns for symbol in symbols}
+        if not any(has_turnover.values()):
+            df['换手率'] = np.nan
+        
+        # 按股票计算指标（与 TechnicalIndicators 的算法一致，只算用到的几项）
+        # 各股票在长表中占连续的一段，直接在每段收盘价数组上调用 ta_kernels 内核
+        close_values = df['收盘'].to_numpy(dtype=np.float64)
+        ma5, ma20, macd, rsi = (np.empty(len(df)) for _ in range(4))
+        bounds = np.cumsum([0] + lengths)
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            segment = close_values[start:stop]
+            ma5[start:stop] = rolling_mean(segment, 5)
+            ma20[start:stop] = rolling_mean(segment, 20)
+            macd[start:stop] = macd_kernel(segment, 2.0 / 13, 2.0 / 27, 2.0 / 10)[2]
             
-            # 3. 波动率特征(最近N天的标准差)
-            if len(df) >= 20:
-                price_returns = df['收盘'].pct_change().tail(20)
-                features['volatility'] = price_returns.std() * 100
+            # 首行涨跌为 NaN，与 delta.where(delta > 0, 0) 一样按 0 计入
+            delta = np.diff(segment, prepend=np.nan)
+            gain = rolling_mean(np.where(delta > 0, delta, 0.0), 14)
+            loss = rolling_mean(np.where(delta < 0, -delta, 0.0), 14)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rsi[start:stop] = 100 - (100 / (1 + gain / loss))
+        df['MA5'] = ma5
+        df['MA20'] = ma20
+        df['MACD'] = macd
+        df['RSI14'] = rsi
+        close = df.groupby('symbol', sort=False)['收盘']
+        
+        # 趋势斜率用到的 MA5 前第4行、MA20 前第9行
+        grouped = df.groupby('symbol', sort=False)
+        df['MA5_prev'] = grouped['MA5'].shift(4)
+        df['MA20_prev'] = grouped['MA20'].shift(9)
+        df['收益率'] = close.pct_change()
+        
+        # 只取最近N天；保留的股票都至少有30行，最近N天的行数 >= k 等价于 days >= k (k <= 30)
+        recent = df.groupby('symbol', sort=False).tail(days).groupby('symbol', sort=False)
+        last = recent.tail(1).set_index('symbol')
+        no_slope = pd.Series(0.0, index=last.index)
+        ma5_slope = (last['MA5'] - last['MA5_prev']) / last['MA5_prev'] * 100 if days >= 5 else no_slope
+        ma20_slope = (last['MA20'] - last['MA20_prev']) / last['MA20_prev'] * 100 if days >= 10 else no_slope
+        ma_trend = (ma5_slope + ma20_slope) / 2
+        turnover_mean = recent['换手率'].mean().to_numpy()
+        
+        # 分组结果与 symbols 顺序一致，统一取成 numpy 数组，逐股票循环时只按位置取值
+        ma_trend = ma_trend.to_numpy()
+        macd = last['MACD'].to_numpy()
+        rsi = last['RSI14'].to_numpy()
+        close_last = last['收盘'].to_numpy()
+        if days >= 5:
+            recent5 = recent.tail(5).groupby('symbol', sort=False)
+            change_5 = recent5['涨跌幅'].sum().to_numpy()
+            turnover_5 = recent5['换手率'].mean().to_numpy()
+        if days >= 20:
+            recent20 = recent.tail(20).groupby('symbol', sort=False)
+            volatility = (recent20['收益率'].std() * 100).to_numpy()
+            high_20 = recent20['最高'].max().to_numpy()
+            low_20 = recent20['最低'].min().to_numpy()
+        
+        features_by_symbol = {}
+        for i, symbol in enumerate(symbols):
+            rt = realtime.get(symbol)
+            features = {
+                'ma_trend': ma_trend[i],
+                'macd': macd[i],
+                'rsi': rsi[i],
+            }
+            if days >= 20:
+                features['volatility'] = volatility[i]
             
-            # 4. 成交量特征
-            if realtime and '换手率' in realtime:
-                features['turnover'] = realtime['换手率']
+            # 成交量特征
+            if rt and '换手率' in rt:
+                features['turnover'] = rt['换手率']
             else:
-                features['turnover'] = df['换手率'].mean() if '换手率' in df.columns else 0
+                features['turnover'] = turnover_mean[i] if has_turnover[symbol] else 0
             
-            # 5. 估值特征
-            if realtime and '市盈率-动态' in realtime:
-                features['pe'] = realtime['市盈率-动态']
+            # 估值特征
+            if rt and '市盈率-动态' in rt:
+                features['pe'] = rt['市盈率-动态']
             
-            # 6. 资金流特征(涨跌幅和换手率的综合)
-            if len(df) >= 5:
-                recent_change = df['涨跌幅'].tail(5).sum()
-                recent_turnover = df['换手率'].tail(5).mean() if '换手率' in df.columns else 0
-                features['capital_flow'] = recent_change * recent_turnover
+            # 资金流特征(涨跌幅和换手率的综合)
+            if days >= 5:
+                features['capital_flow'] = change_5[i] * (turnover_5[i] if has_turnover[symbol] else 0)
             
-            # 7. 价格位置(相对于近期高低点)
-            if len(df) >= 20:
-                high_20 = df['最高'].tail(20).max()
-                low_20 = df['最低'].tail(20).min()
-                current = df['收盘'].iloc[-1]
-                features['price_position'] = (current - low_20) / (high_20 - low_20) * 100 if high_20 != low_20 else 50
+            # 价格位置(相对于近期高低点)
+            if days >= 20:
+                high, low = high_20[i], low_20[i]
+                features['price_position'] = (close_last[i] - low) / (high - low) * 100 if high != low else 50
             
-            return features
-            
-        except Exception as e:
-            print(f"提取 {symbol} 特征失败: {e}")
-            return None
+            features_by_symbol[symbol] = features
+        
+        return features_by_symbol
     
     def find_similar_stocks(self,
                            target_symbol: str,
                            candidate_symbols: List[str] = None,
                            top_n: int = 10,
                            min_score: float = 60.0,
-                           exclude_same_sector: bool = False) -> pd.DataFrame:
+                           exclude_same_sector: bool = False,
+                           max_workers: int = 16) -> pd.DataFrame:
         """
         查找相似股票
         
@@ -193,6 +351,7 @@ class SimilarStockFinder:
             top_n: 返回前N只最相似的股票
             min_score: 最小相似度分数
             exclude_same_sector: 是否排除同板块股票
+            max_workers: 并发获取历史数据的线程数（未安装 aiohttp 时使用）
             
         Returns:
             DataFrame: 相似股票列表及相似度分数
@@ -218,66 +377,55 @@ class SimilarStockFinder:
         # 如果没有提供候选列表,从市场中筛选
         if candidate_symbols is None:
             print("\n2. 获取候选股票列表...")
-            stock_list = self.fetcher.get_stock_list()
+            codes = self.fetcher.screenable_codes()
             
-            if stock_list.empty:
+            if codes.size == 0:
                 print("无法获取股票列表")
                 return pd.DataFrame()
             
-            # 基础过滤
-            stock_list = stock_list[~stock_list['代码'].str.startswith('688')]  # 排除科创板
-            stock_list = stock_list[~stock_list['名称'].str.contains('ST', na=False)]  # 排除ST
-            stock_list = stock_list[stock_list['代码'] != target_symbol]  # 排除目标股票
-            
-            # 限制数量(避免分析太多)
-            candidate_symbols = stock_list['代码'].head(100).tolist()
+            # 排除科创板、ST(已在 screenable_codes 中过滤)和目标股票，限制数量(避免分析太多)
+            candidate_symbols = codes[codes != target_symbol][:100].tolist()
         
         print(f"\n3. 分析 {len(candidate_symbols)} 只候选股票...")
         
-        similar_stocks = []
-        
-        for idx, symbol in enumerate(candidate_symbols):
-            if (idx + 1) % 10 == 0:
-                print(f"   进度: {idx + 1}/{len(candidate_symbols)}")
-            
-            try:
-                # 获取候选股票特征
-                candidate_features = self.extract_stock_features(symbol)
-                
-                if candidate_features is None:
-                    continue
-                
-                # 计算相似度
-                score = self.calculate_similarity_score(target_features, candidate_features)
-                
-                if score >= min_score:
-                    # 获取基本信息
-                    realtime = self.fetcher.get_stock_realtime(symbol)
-                    
-                    similar_stocks.append({
-                        '代码': symbol,
-                        '名称': realtime.get('名称', '') if realtime else '',
-                        '相似度': score,
-                        '最新价': realtime.get('最新价', 0) if realtime else 0,
-                        '涨跌幅': realtime.get('涨跌幅', 0) if realtime else 0,
-                        '换手率': realtime.get('换手率', 0) if realtime else 0,
-                        'RSI': candidate_features.get('rsi', 0),
-                        '趋势': candidate_features.get('ma_trend', 0),
-                        '市盈率': candidate_features.get('pe', 0)
-                    })
-                
-                time.sleep(0.2)  # 避免请求过快
-                
-            except Exception as e:
-                continue
-        
-        if not similar_stocks:
+        # 实时行情一次批量获取；已缓存特征的股票不再请求历史数据，
+        # 其余股票一次性并发获取历史数据，批量提取特征后写入缓存
+        start_date, end_date = self._hist_range(60)
+        realtime = self.fetcher.get_stock_realtime_many(candidate_symbols)
+        candidate_features = self._cached_features(candidate_symbols, end_date, 60)
+        missing = [symbol for symbol in candidate_symbols if symbol not in candidate_features]
+        if missing:
+            histories = self.fetcher.get_stock_hist_many(missing, start_date, end_date,
+                                                         max_workers=max_workers)
+            fresh = self.extract_features_batch(histories, realtime=realtime)
+            self._store_features(fresh, end_date, 60)
+            candidate_features.update(fresh)
+        
+        # 所有候选股票的相似度一次算出
+        symbols = [symbol for symbol in candidate_symbols if symbol in candidate_features]
+        features_list = [candidate_features[symbol] for symbol in symbols]
+        scores = self.score_matrix(self.feature_matrix([target_features])[0],
+                                   self.feature_matrix(features_list))
+        
+        passed = np.flatnonzero(scores >= min_score)
+        if passed.size == 0:
             print("\n未找到相似的股票")
             return pd.DataFrame()
         
-        # 整理结果
-        result_df = pd.DataFrame(similar_stocks)
-        result_df = result_df.sort_values('相似度', ascending=False).head(top_n)
+        # 按相似度降序取前 top_n
+        top = passed[np.argsort(-scores[passed], kind='stable')[:top_n]]
+        
+        # 整理结果: 每只股票一条定长元组，最后一次构造 DataFrame
+        records = []
+        for i in top:
+            info = realtime.get(symbols[i], {})
+            features = features_list[i]
+            records.append((
+                symbols[i], info.get('名称', ''), float(scores[i]),
+                info.get('最新价') or 0, info.get('涨跌幅') or 0, info.get('换手率') or 0,
+                features.get('rsi', 0), features.get('ma_trend', 0), features.get('pe') or 0,
+            ))
+        result_df = pd.DataFrame.from_records(records, columns=self.RESULT_COLUMNS)
         
         print("\n" + "=" * 60)
         print(f"找到 {len(result_df)} 只相似股票")
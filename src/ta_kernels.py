@@ -0,0 +1,449 @@
+"""
+技术指标计算内核
+对纯数值循环使用 Numba JIT 编译；未安装 numba 时退化为普通 Python 函数，结果一致
+内核均以 nogil 编译，多个线程同时计算指标时可以并行执行
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """numba 不可用时的占位装饰器，直接返回原函数"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
+
+
+# 均线数组中含 NaN (前 period-1 个值)，不能开启 fastmath，否则 NaN 比较结果未定义
+# 输入多来自 pandas 的 to_numpy()，写时复制模式下是只读数组，不写死签名，由 numba 按实际类型编译
+@njit(nogil=True, cache=True)
+def golden_cross(ma_short, ma_long):
+    """
+    金叉掩码: 短期均线上穿长期均线
+
+    Args:
+        ma_short: 短期均线数组
+        ma_long: 长期均线数组
+
+    Returns:
+        ndarray: 布尔数组，True 表示当日出现金叉
+    """
+    n = ma_short.shape[0]
+    out = np.zeros(n, np.bool_)
+    for i in range(1, n):
+        out[i] = ma_short[i] > ma_long[i] and ma_short[i - 1] <= ma_long[i - 1]
+    return out
+
+
+@njit(nogil=True, cache=True)
+def death_cross(ma_short, ma_long):
+    """
+    死叉掩码: 短期均线下穿长期均线
+
+    Args:
+        ma_short: 短期均线数组
+        ma_long: 长期均线数组
+
+    Returns:
+        ndarray: 布尔数组，True 表示当日出现死叉
+    """
+    n = ma_short.shape[0]
+    out = np.zeros(n, np.bool_)
+    for i in range(1, n):
+        out[i] = ma_short[i] < ma_long[i] and ma_short[i - 1] >= ma_long[i - 1]
+    return out
+
+
+@njit('Tuple((float64[:], float64[:], int64[:], int64[:]))'
+      '(float64[:], float64[:], int64[:], int64, int64, float64, float64, float64)',
+      nogil=True, cache=True)
+def screen_kernel(close, pct_chg, offsets, window, n_recent, threshold, min_ratio, max_ratio):
+    """
+    批量计算多只股票的筛选指标
+
+    各股票的数据首尾相接存放，第 g 只股票占据 [offsets[g], offsets[g+1])
+    不开启 parallel: 筛选的数据量很小，而 numba 的并行线程池会使导入本模块后再启动
+    进程池的程序在退出时挂起
+
+    Args:
+        close: 收盘价
+        pct_chg: 涨跌幅(%)
+        offsets: 各股票数据的起始位置，长度为股票数+1
+        window: 均线周期
+        n_recent: 检查涨停的最近天数
+        threshold: 涨停判定的涨幅阈值(%)
+        min_ratio: 收盘价/均线 下限
+        max_ratio: 收盘价/均线 上限
+
+    Returns:
+        tuple: (最新收盘价, 最新均线值, 最近一次涨停的位置(无为-1), 涨停次数)，
+               数据不足或窗口内有缺失值时均线为 NaN；
+               收盘价/均线 不在区间内的股票不扫描涨停，位置为-1、次数为0
+    """
+    n_groups = offsets.shape[0] - 1
+    last_close = np.full(n_groups, np.nan)
+    ma = np.full(n_groups, np.nan)
+    last_hit = np.full(n_groups, -1, np.int64)
+    hits = np.zeros(n_groups, np.int64)
+
+    for g in range(n_groups):
+        start = offsets[g]
+        end = offsets[g + 1]
+        if end == start:
+            continue
+        last_close[g] = close[end - 1]
+
+        if end - start >= window:
+            total = 0.0
+            for i in range(end - window, end):
+                total += close[i]
+            ma[g] = total / window
+
+        # 均线比值不符合的股票必然被淘汰，跳过涨停扫描(NaN 比较为 False，同样跳过)
+        ratio = last_close[g] / ma[g]
+        if not (ratio >= min_ratio and ratio <= max_ratio):
+            continue
+
+        for i in range(max(start, end - n_recent), end):
+            if pct_chg[i] >= threshold:
+                hits[g] += 1
+                last_hit[g] = i
+
+    return last_close, ma, last_hit, hits
+
+
+@njit(nogil=True, cache=True)
+def rolling_mean(values, window):
+    """
+    滚动均值，结果与 pandas rolling(window).mean() 一致
+
+    维护窗口内的累计和，每步加入新值、减去移出的值，整体 O(N)；
+    窗口内含 NaN 或数据不足 window 个时结果为 NaN
+
+    Args:
+        values: 数值数组
+        window: 窗口长度
+
+    Returns:
+        ndarray: 滚动均值
+    """
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+    total = 0.0
+    valid = 0
+    for i in range(n):
+        x = values[i]
+        if not np.isnan(x):
+            total += x
+            valid += 1
+        if i >= window:
+            old = values[i - window]
+            if not np.isnan(old):
+                total -= old
+                valid -= 1
+        if valid == window:
+            out[i] = total / window
+    return out
+
+
+@njit(nogil=True, cache=True)
+def rolling_mean_std(values, window):
+    """
+    一次遍历同时计算滚动均值和滚动标准差(ddof=1)
+
+    用 Welford 算法在窗口移动时增删样本，结果与 pandas rolling(window).mean()/.std() 一致；
+    增删累积的舍入误差每移动 window 步按窗口内数据重算一次消除，
+    窗口内数值全部相同时标准差为 0；窗口内含 NaN 或数据不足 window 个时结果为 NaN
+
+    Args:
+        values: 数值数组
+        window: 窗口长度
+
+    Returns:
+        tuple: (滚动均值, 滚动标准差)
+    """
+    n = values.shape[0]
+    mean_out = np.full(n, np.nan)
+    std_out = np.full(n, np.nan)
+    mean = 0.0
+    m2 = 0.0
+    valid = 0
+    same_run = 0
+    for i in range(n):
+        x = values[i]
+        if not np.isnan(x):
+            valid += 1
+            delta = x - mean
+            mean += delta / valid
+            m2 += delta * (x - mean)
+        if i > 0 and x == values[i - 1]:
+            same_run += 1
+        else:
+            same_run = 1
+        if i >= window:
+            old = values[i - window]
+            if not np.isnan(old):
+                valid -= 1
+                if valid == 0:
+                    mean = 0.0
+                    m2 = 0.0
+                else:
+                    delta = old - mean
+                    mean -= delta / valid
+                    m2 -= delta * (old - mean)
+        if valid != window:
+            continue
+
+        if i % window == 0:
+            # 按窗口内数据重算，消除累积误差
+            total = 0.0
+            for j in range(i - window + 1, i + 1):
+                total += values[j]
+            mean = total / window
+            m2 = 0.0
+            for j in range(i - window + 1, i + 1):
+                m2 += (values[j] - mean) ** 2
+
+        if same_run >= window:
+            mean_out[i] = x
+            std_out[i] = 0.0 if window > 1 else np.nan
+        else:
+            mean_out[i] = mean
+            if window > 1:
+                std_out[i] = np.sqrt(max(m2, 0.0) / (window - 1))
+    return mean_out, std_out
+
+
+@njit(nogil=True, cache=True)
+def _ema_step(value, weight, x, alpha):
+    """
+    EMA 递推一步，与 pandas ewm(adjust=False) 的 NaN 处理一致:
+    缺失值处保持上一个结果，但旧值的权重照常衰减
+
+    Returns:
+        tuple: (新的 EMA 值, 旧值权重)
+    """
+    if value == value:
+        weight *= 1.0 - alpha
+        if x == x:
+            if value != x:
+                value = (weight * value + alpha * x) / (weight + alpha)
+            weight = 1.0
+    elif x == x:
+        value = x
+    return value, weight
+
+
+@njit(nogil=True, cache=True)
+def ema(values, alpha):
+    """
+    指数移动平均，结果与 pandas ewm(alpha=alpha, adjust=False).mean() 一致
+
+    Args:
+        values: 数值数组
+        alpha: 平滑系数，span 周期对应 2/(span+1)
+
+    Returns:
+        ndarray: EMA
+    """
+    n = values.shape[0]
+    out = np.empty(n)
+    value = np.nan
+    weight = 1.0
+    for i in range(n):
+        value, weight = _ema_step(value, weight, values[i], alpha)
+        out[i] = value
+    return out
+
+
+@njit(nogil=True, cache=True)
+def macd_kernel(close, fast_alpha, slow_alpha, signal_alpha):
+    """
+    一次遍历同时计算快慢 EMA、MACD 线和信号线
+
+    Args:
+        close: 收盘价
+        fast_alpha: 快线平滑系数
+        slow_alpha: 慢线平滑系数
+        signal_alpha: 信号线平滑系数
+
+    Returns:
+        tuple: (快线 EMA, 慢线 EMA, MACD, 信号线)
+    """
+    n = close.shape[0]
+    ema_fast = np.empty(n)
+    ema_slow = np.empty(n)
+    macd = np.empty(n)
+    signal = np.empty(n)
+    fast, fast_w = np.nan, 1.0
+    slow, slow_w = np.nan, 1.0
+    sig, sig_w = np.nan, 1.0
+    for i in range(n):
+        fast, fast_w = _ema_step(fast, fast_w, close[i], fast_alpha)
+        slow, slow_w = _ema_step(slow, slow_w, close[i], slow_alpha)
+        diff = fast - slow
+        sig, sig_w = _ema_step(sig, sig_w, diff, signal_alpha)
+        ema_fast[i] = fast
+        ema_slow[i] = slow
+        macd[i] = diff
+        signal[i] = sig
+    return ema_fast, ema_slow, macd, signal
+
+
+@njit(nogil=True, cache=True)
+def kdj_kernel(rsv, k_alpha, d_alpha):
+    """
+    一次遍历计算 KDJ 的 K、D 值(K 为 RSV 的 EMA，D 为 K 的 EMA)
+
+    Args:
+        rsv: 未成熟随机值
+        k_alpha: K 值平滑系数 (1/m1)
+        d_alpha: D 值平滑系数 (1/m2)
+
+    Returns:
+        tuple: (K, D)
+    """
+    n = rsv.shape[0]
+    k_out = np.empty(n)
+    d_out = np.empty(n)
+    k, k_w = np.nan, 1.0
+    d, d_w = np.nan, 1.0
+    for i in range(n):
+        k, k_w = _ema_step(k, k_w, rsv[i], k_alpha)
+        d, d_w = _ema_step(d, d_w, k, d_alpha)
+        k_out[i] = k
+        d_out[i] = d
+    return k_out, d_out
+
+
+@njit(nogil=True, cache=True)
+def rolling_min_max(low, high, window):
+    """
+    滑动窗口最小值和最大值，结果与 pandas rolling(window, min_periods=1).min()/.max() 一致
+
+    用单调队列保存窗口内可能成为最值的位置，每个位置最多入队出队一次，整体 O(N)；
+    NaN 不参与比较，窗口内全为 NaN 时结果为 NaN
+
+    Args:
+        low: 求最小值的数组（如最低价）
+        high: 求最大值的数组（如最高价）
+        window: 窗口长度
+
+    Returns:
+        tuple: (滚动最小值, 滚动最大值)
+    """
+    n = low.shape[0]
+    lo_out = np.full(n, np.nan)
+    hi_out = np.full(n, np.nan)
+    # 环形缓冲区实现的双端队列，队首 head、元素个数 size
+    lo_idx = np.empty(window, np.int64)
+    hi_idx = np.empty(window, np.int64)
+    lo_head = lo_size = 0
+    hi_head = hi_size = 0
+    for i in range(n):
+        # 移出窗口外的队首
+        if lo_size > 0 and lo_idx[lo_head] <= i - window:
+            lo_head = (lo_head + 1) % window
+            lo_size -= 1
+        if hi_size > 0 and hi_idx[hi_head] <= i - window:
+            hi_head = (hi_head + 1) % window
+            hi_size -= 1
+
+        x = low[i]
+        if x == x:
+            # 队尾不小于新值的位置不可能再成为最小值
+            while lo_size > 0 and low[lo_idx[(lo_head + lo_size - 1) % window]] >= x:
+                lo_size -= 1
+            lo_idx[(lo_head + lo_size) % window] = i
+            lo_size += 1
+        x = high[i]
+        if x == x:
+            while hi_size > 0 and high[hi_idx[(hi_head + hi_size - 1) % window]] <= x:
+                hi_size -= 1
+            hi_idx[(hi_head + hi_size) % window] = i
+            hi_size += 1
+
+        if lo_size > 0:
+            lo_out[i] = low[lo_idx[lo_head]]
+        if hi_size > 0:
+            hi_out[i] = high[hi_idx[hi_head]]
+    return lo_out, hi_out
+
+
+@njit(nogil=True, cache=True)
+def kdj_trade_signal(j, k, d, oversold, overbought):
+    """
+    一次遍历生成 KDJ 策略的交易信号
+
+    规则依次为 J 上穿超卖线买入、J 下穿超买线卖出、K<50 的金叉买入、K>50 的死叉卖出，
+    同一天满足多条规则时以后面的规则为准
+
+    Args:
+        j: J 值
+        k: K 值
+        d: D 值
+        oversold: 超卖线
+        overbought: 超买线
+
+    Returns:
+        ndarray: 交易信号，1 买入，-1 卖出，0 无信号
+    """
+    n = j.shape[0]
+    out = np.zeros(n, np.int64)
+    for i in range(1, n):
+        if k[i] < d[i] and k[i - 1] >= d[i - 1] and k[i] > 50:
+            out[i] = -1
+        elif k[i] > d[i] and k[i - 1] <= d[i - 1] and k[i] < 50:
+            out[i] = 1
+        elif j[i] < overbought and j[i - 1] >= overbought:
+            out[i] = -1
+        elif j[i] > oversold and j[i - 1] <= oversold:
+            out[i] = 1
+    return out
+
+
+@njit(nogil=True, cache=True)
+def wilder_rsi(close, period):
+    """
+    Wilder 平滑的 RSI: 首个平均涨跌幅取前 period 个涨跌的简单平均，
+    之后按 avg = (avg * (period - 1) + 当日值) / period 递推
+
+    涨跌拆分写成 (d ± |d|) / 2，循环内没有分支；缺失的涨跌按 0 计
+
+    Args:
+        close: 收盘价
+        period: RSI 周期
+
+    Returns:
+        ndarray: RSI，前 period 个值为 NaN
+    """
+    n = close.shape[0]
+    out = np.full(n, np.nan)
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, n):
+        d = close[i] - close[i - 1]
+        if np.isnan(d):
+            d = 0.0
+        gain = (d + abs(d)) * 0.5
+        loss = (abs(d) - d) * 0.5
+        if i <= period:
+            avg_gain += gain / period
+            avg_loss += loss / period
+            if i < period:
+                continue
+        else:
+            avg_gain = (avg_gain * (period - 1) + gain) / period
+            avg_loss = (avg_loss * (period - 1) + loss) / period
+        if avg_loss > 0:
+            out[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        elif avg_gain > 0:
+            out[i] = 100.0
+    return out
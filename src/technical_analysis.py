@@ -4,11 +4,47 @@
 """
 import pandas as pd
 import numpy as np
-from typing import Tuple
+from typing import Dict, Tuple
+
+from src.ta_kernels import (golden_cross, death_cross, ema, kdj_kernel, macd_kernel,
+                            rolling_mean, rolling_mean_std, rolling_min_max, wilder_rsi)
 
 
 class TechnicalIndicators:
-    """技术指标计算器"""
+    """
+    技术指标计算器
+    
+    每个指标由 *_columns 方法从原始数据算出新列 {列名: 数组}，不复制 DataFrame；
+    calculate_* 把新列拼接到原数据上返回，calculate_all_indicators 汇总所有新列后只拼接一次
+    """
+    
+    @staticmethod
+    def with_columns(df: pd.DataFrame, columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """
+        把新列一次拼接到数据后面，同名的旧列被替换
+        
+        Args:
+            df: 原始数据
+            columns: {列名: 数组或 Series}
+            
+        Returns:
+            DataFrame: 添加了新列的数据
+        """
+        if any(name in df.columns for name in columns):
+            # 有同名列时按原位置替换
+            result = df.assign(**columns)
+        else:
+            result = pd.concat([df, pd.DataFrame(columns, index=df.index)], axis=1)
+        result.attrs = dict(df.attrs)
+        return result
+    
+    @staticmethod
+    def ma_columns(df: pd.DataFrame,
+                   price_col: str = '收盘',
+                   periods: list = [5, 10, 20, 60, 120]) -> Dict[str, np.ndarray]:
+        """均线列 MA{period}"""
+        prices = df[price_col].to_numpy(dtype=np.float64)
+        return {f'MA{period}': rolling_mean(prices, period) for period in periods}
     
     @staticmethod
     def calculate_ma(df: pd.DataFrame, 
@@ -25,10 +61,16 @@ class TechnicalIndicators:
         Returns:
             DataFrame: 添加了MA指标的数据
         """
-        result = df.copy()
-        for period in periods:
-            result[f'MA{period}'] = result[price_col].rolling(window=period).mean()
-        return result
+        return TechnicalIndicators.with_columns(
+            df, TechnicalIndicators.ma_columns(df, price_col, periods))
+    
+    @staticmethod
+    def ema_columns(df: pd.DataFrame,
+                    price_col: str = '收盘',
+                    periods: list = [12, 26]) -> Dict[str, np.ndarray]:
+        """指数均线列 EMA{period}"""
+        prices = df[price_col].to_numpy(dtype=np.float64)
+        return {f'EMA{period}': ema(prices, 2.0 / (period + 1)) for period in periods}
     
     @staticmethod
     def calculate_ema(df: pd.DataFrame,
@@ -45,10 +87,21 @@ class TechnicalIndicators:
         Returns:
             DataFrame: 添加了EMA指标的数据
         """
-        result = df.copy()
-        for period in periods:
-            result[f'EMA{period}'] = result[price_col].ewm(span=period, adjust=False).mean()
-        return result
+        return TechnicalIndicators.with_columns(
+            df, TechnicalIndicators.ema_columns(df, price_col, periods))
+    
+    @staticmethod
+    def macd_columns(df: pd.DataFrame,
+                     price_col: str = '收盘',
+                     fast: int = 12,
+                     slow: int = 26,
+                     signal: int = 9) -> Dict[str, np.ndarray]:
+        """MACD 列 MACD/Signal/Histogram，快慢线和信号线在一次遍历中算出"""
+        _, _, macd, signal_line = macd_kernel(
+            df[price_col].to_numpy(dtype=np.float64),
+            2.0 / (fast + 1), 2.0 / (slow + 1), 2.0 / (signal + 1)
+        )
+        return {'MACD': macd, 'Signal': signal_line, 'Histogram': macd - signal_line}
     
     @staticmethod
     def calculate_macd(df: pd.DataFrame,
@@ -69,27 +122,36 @@ class TechnicalIndicators:
         Returns:
             DataFrame: 添加了MACD指标的数据
         """
-        result = df.copy()
-        
-        # 计算EMA
-        ema_fast = result[price_col].ewm(span=fast, adjust=False).mean()
-        ema_slow = result[price_col].ewm(span=slow, adjust=False).mean()
-        
-        # MACD线
-        result['MACD'] = ema_fast - ema_slow
-        
-        # 信号线
-        result['Signal'] = result['MACD'].ewm(span=signal, adjust=False).mean()
+        return TechnicalIndicators.with_columns(
+            df, TechnicalIndicators.macd_columns(df, price_col, fast, slow, signal))
+    
+    @staticmethod
+    def rsi_columns(df: pd.DataFrame,
+                    price_col: str = '收盘',
+                    period: int = 14,
+                    wilder: bool = False) -> Dict[str, np.ndarray]:
+        """RSI 列 RSI{period}，默认用涨跌幅的简单移动平均，wilder=True 时用 Wilder 平滑"""
+        close = df[price_col].to_numpy(dtype=np.float64)
+        if wilder:
+            return {f'RSI{period}': wilder_rsi(close, period)}
+        
+        # 计算价格变化，首行无变化按 0 计
+        delta = np.diff(close, prepend=np.nan)
         
-        # 柱状图
-        result['Histogram'] = result['MACD'] - result['Signal']
+        # 分离涨跌
+        gain = rolling_mean(np.where(delta > 0, delta, 0.0), period)
+        loss = rolling_mean(np.where(delta < 0, -delta, 0.0), period)
         
-        return result
+        # 计算RS和RSI
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = gain / loss
+        return {f'RSI{period}': 100 - (100 / (1 + rs))}
     
     @staticmethod
     def calculate_rsi(df: pd.DataFrame,
                       price_col: str = '收盘',
-                      period: int = 14) -> pd.DataFrame:
+                      period: int = 14,
+                      wilder: bool = False) -> pd.DataFrame:
         """
         计算RSI指标
         
@@ -97,24 +159,28 @@ class TechnicalIndicators:
             df: 包含价格数据的DataFrame
             price_col: 价格列名
             period: RSI周期
+            wilder: 是否使用 Wilder 平滑（默认 False，使用涨跌幅的简单移动平均，与之前的结果一致）
             
         Returns:
             DataFrame: 添加了RSI指标的数据
         """
-        result = df.copy()
-        
-        # 计算价格变化
-        delta = result[price_col].diff()
-        
-        # 分离涨跌
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        
-        # 计算RS和RSI
-        rs = gain / loss
-        result[f'RSI{period}'] = 100 - (100 / (1 + rs))
-        
-        return result
+        return TechnicalIndicators.with_columns(
+            df, TechnicalIndicators.rsi_columns(df, price_col, period, wilder))
+    
+    @staticmethod
+    def kdj_columns(df: pd.DataFrame,
+                    n: int = 9,
+                    m1: int = 3,
+                    m2: int = 3) -> Dict[str, np.ndarray]:
+        """KDJ 列 K/D/J"""
+        # 计算RSV (n日最低价、最高价一次遍历算出)
+        low_list, high_list = rolling_min_max(df['最低'].to_numpy(dtype=np.float64),
+                                              df['最高'].to_numpy(dtype=np.float64), n)
+        rsv = (df['收盘'].to_numpy(dtype=np.float64) - low_list) / (high_list - low_list) * 100
+        
+        # 计算K、D、J (com=m-1 对应平滑系数 1/m)
+        k, d = kdj_kernel(rsv, 1.0 / m1, 1.0 / m2)
+        return {'K': k, 'D': d, 'J': 3 * k - 2 * d}
     
     @staticmethod
     def calculate_kdj(df: pd.DataFrame,
@@ -133,19 +199,22 @@ class TechnicalIndicators:
         Returns:
             DataFrame: 添加了KDJ指标的数据
         """
-        result = df.copy()
-        
-        # 计算RSV
-        low_list = result['最低'].rolling(window=n, min_periods=1).min()
-        high_list = result['最高'].rolling(window=n, min_periods=1).max()
-        rsv = (result['收盘'] - low_list) / (high_list - low_list) * 100
-        
-        # 计算K、D、J
-        result['K'] = rsv.ewm(com=m1-1, adjust=False).mean()
-        result['D'] = result['K'].ewm(com=m2-1, adjust=False).mean()
-        result['J'] = 3 * result['K'] - 2 * result['D']
-        
-        return result
+        return TechnicalIndicators.with_columns(
+            df, TechnicalIndicators.kdj_columns(df, n, m1, m2))
+    
+    @staticmethod
+    def boll_columns(df: pd.DataFrame,
+                     price_col: str = '收盘',
+                     period: int = 20,
+                     std_dev: float = 2.0) -> Dict[str, np.ndarray]:
+        """布林带列 BOLL_MIDDLE/BOLL_UPPER/BOLL_LOWER"""
+        # 中轨和标准差一次遍历算出
+        middle, std = rolling_mean_std(df[price_col].to_numpy(dtype=np.float64), period)
+        return {
+            'BOLL_MIDDLE': middle,
+            'BOLL_UPPER': middle + std_dev * std,
+            'BOLL_LOWER': middle - std_dev * std,
+        }
     
     @staticmethod
     def calculate_boll(df: pd.DataFrame,
@@ -164,19 +233,18 @@ class TechnicalIndicators:
         Returns:
             DataFrame: 添加了布林带指标的数据
         """
-        result = df.copy()
-        
-        # 中轨
-        result['BOLL_MIDDLE'] = result[price_col].rolling(window=period).mean()
-        
-        # 标准差
-        std = result[price_col].rolling(window=period).std()
-        
-        # 上轨和下轨
-        result['BOLL_UPPER'] = result['BOLL_MIDDLE'] + (std_dev * std)
-        result['BOLL_LOWER'] = result['BOLL_MIDDLE'] - (std_dev * std)
+        return TechnicalIndicators.with_columns(
+            df, TechnicalIndicators.boll_columns(df, price_col, period, std_dev))
+    
+    @staticmethod
+    def atr_columns(df: pd.DataFrame, period: int = 14) -> Dict[str, pd.Series]:
+        """ATR 列"""
+        high_low = df['最高'] - df['最低']
+        high_close = np.abs(df['最高'] - df['收盘'].shift())
+        low_close = np.abs(df['最低'] - df['收盘'].shift())
         
-        return result
+        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+        return {'ATR': tr.rolling(window=period).mean()}
     
     @staticmethod
     def calculate_atr(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
@@ -190,16 +258,15 @@ class TechnicalIndicators:
         Returns:
             DataFrame: 添加了ATR指标的数据
         """
-        result = df.copy()
-        
-        high_low = result['最高'] - result['最低']
-        high_close = np.abs(result['最高'] - result['收盘'].shift())
-        low_close = np.abs(result['最低'] - result['收盘'].shift())
-        
-        tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        result['ATR'] = tr.rolling(window=period).mean()
-        
-        return result
+        return TechnicalIndicators.with_columns(df, TechnicalIndicators.atr_columns(df, period))
+    
+    @staticmethod
+    def volume_ma_columns(df: pd.DataFrame,
+                          volume_col: str = '成交量',
+                          periods: list = [5, 10, 20]) -> Dict[str, np.ndarray]:
+        """成交量均线列 VOL_MA{period}"""
+        volumes = df[volume_col].to_numpy(dtype=np.float64)
+        return {f'VOL_MA{period}': rolling_mean(volumes, period) for period in periods}
     
     @staticmethod
     def calculate_volume_ma(df: pd.DataFrame,
@@ -216,41 +283,45 @@ class TechnicalIndicators:
         Returns:
             DataFrame: 添加了成交量均线的数据
         """
-        result = df.copy()
-        for period in periods:
-            result[f'VOL_MA{period}'] = result[volume_col].rolling(window=period).mean()
-        return result
+        return TechnicalIndicators.with_columns(
+            df, TechnicalIndicators.volume_ma_columns(df, volume_col, periods))
+    
+    # 指标名称 -> 计算新列的方法
+    ALL_INDICATORS = ('MA', 'EMA', 'MACD', 'RSI', 'KDJ', 'BOLL', 'ATR', 'VOL')
+    _INDICATOR_METHODS = {
+        'MA': 'ma_columns',              # 均线
+        'EMA': 'ema_columns',
+        'MACD': 'macd_columns',          # 动量指标
+        'RSI': 'rsi_columns',
+        'KDJ': 'kdj_columns',
+        'BOLL': 'boll_columns',          # 波动指标
+        'ATR': 'atr_columns',
+        'VOL': 'volume_ma_columns',      # 成交量指标
+    }
     
     @staticmethod
-    def calculate_all_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    def calculate_all_indicators(df: pd.DataFrame,
+                                 indicators: tuple = ALL_INDICATORS) -> pd.DataFrame:
         """
-        计算所有常用技术指标
+        计算常用技术指标
+        
+        只计算 indicators 指定的指标，各指标的新列汇总后一次拼接
         
         Args:
             df: 包含价格数据的DataFrame
+            indicators: 要计算的指标，可选 MA/EMA/MACD/RSI/KDJ/BOLL/ATR/VOL，默认全部
             
         Returns:
-            DataFrame: 添加了所有指标的数据
+            DataFrame: 添加了指标的数据
         """
-        result = df.copy()
-        
-        # 均线
-        result = TechnicalIndicators.calculate_ma(result)
-        result = TechnicalIndicators.calculate_ema(result)
-        
-        # 动量指标
-        result = TechnicalIndicators.calculate_macd(result)
-        result = TechnicalIndicators.calculate_rsi(result)
-        result = TechnicalIndicators.calculate_kdj(result)
-        
-        # 波动指标
-        result = TechnicalIndicators.calculate_boll(result)
-        result = TechnicalIndicators.calculate_atr(result)
-        
-        # 成交量指标
-        result = TechnicalIndicators.calculate_volume_ma(result)
-        
-        return result
+        columns = {}
+        for name in indicators:
+            if name not in TechnicalIndicators._INDICATOR_METHODS:
+                raise ValueError(f"未知指标: {name}")
+            method = getattr(TechnicalIndicators, TechnicalIndicators._INDICATOR_METHODS[name])
+            columns.update(method(df))
+        
+        return TechnicalIndicators.with_columns(df, columns)
     
     @staticmethod
     def find_golden_cross(df: pd.DataFrame,
@@ -270,13 +341,49 @@ class TechnicalIndicators:
         result = df.copy()
         
         # 金叉: 短期均线上穿长期均线
-        result['Golden_Cross'] = (
-            (result[short_ma] > result[long_ma]) & 
-            (result[short_ma].shift(1) <= result[long_ma].shift(1))
+        result['Golden_Cross'] = golden_cross(
+            result[short_ma].to_numpy(dtype=np.float64),
+            result[long_ma].to_numpy(dtype=np.float64)
         )
         
         return result
     
+    @staticmethod
+    def find_recent_golden_cross(df: pd.DataFrame,
+                                 lookback: int = 10,
+                                 short_ma: str = 'MA5',
+                                 long_ma: str = 'MA20',
+                                 group_col: str = None) -> pd.DataFrame:
+        """
+        只在最近 lookback 个交易日内寻找金叉信号
+        
+        Args:
+            df: 包含均线数据的DataFrame
+            lookback: 回看的交易日数
+            short_ma: 短期均线列名
+            long_ma: 长期均线列名
+            group_col: 多只股票合并的长表中的分组列(如 'symbol')，None 表示单只股票
+            
+        Returns:
+            DataFrame: 最近 lookback+1 行(按组)的数据，添加了金叉信号
+        """
+        # 多取1行用于和前一日比较
+        if group_col is None:
+            tail = df.tail(lookback + 1).copy()
+            tail['Golden_Cross'] = golden_cross(
+                tail[short_ma].to_numpy(dtype=np.float64),
+                tail[long_ma].to_numpy(dtype=np.float64)
+            )
+        else:
+            tail = df.groupby(group_col, sort=False).tail(lookback + 1).copy()
+            prev = tail.groupby(group_col, sort=False)[[short_ma, long_ma]].shift()
+            tail['Golden_Cross'] = (
+                (tail[short_ma] > tail[long_ma]) &
+                (prev[short_ma] <= prev[long_ma])
+            )
+        
+        return tail
+    
     @staticmethod
     def find_death_cross(df: pd.DataFrame,
                         short_ma: str = 'MA5',
@@ -295,9 +402,9 @@ class TechnicalIndicators:
         result = df.copy()
         
         # 死叉: 短期均线下穿长期均线
-        result['Death_Cross'] = (
-            (result[short_ma] < result[long_ma]) & 
-            (result[short_ma].shift(1) >= result[long_ma].shift(1))
+        result['Death_Cross'] = death_cross(
+            result[short_ma].to_numpy(dtype=np.float64),
+            result[long_ma].to_numpy(dtype=np.float64)
         )
         
         return result
@@ -6,6 +6,8 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple
 
+from src.backtest import run_backtest
+
 
 class DualMovingAverageStrategy:
     """双均线策略"""
@@ -32,21 +34,16 @@ class DualMovingAverageStrategy:
         Returns:
             DataFrame: 添加了交易信号的数据
         """
-        result = df.copy()
-        
         # 计算均线
-        result['MA_Short'] = result['收盘'].rolling(window=self.short_period).mean()
-        result['MA_Long'] = result['收盘'].rolling(window=self.long_period).mean()
-        
-        # 生成信号
-        result['Signal'] = 0
-        result.loc[result['MA_Short'] > result['MA_Long'], 'Signal'] = 1  # 买入信号
-        result.loc[result['MA_Short'] < result['MA_Long'], 'Signal'] = -1  # 卖出信号
+        ma_short = df['收盘'].rolling(window=self.short_period).mean()
+        ma_long = df['收盘'].rolling(window=self.long_period).mean()
         
-        # 找出交叉点
-        result['Position'] = result['Signal'].diff()
+        # 生成信号: 短均线在上为买入(1)，在下为卖出(-1)，其余为 0
+        signal = np.where(ma_short > ma_long, 1, np.where(ma_short < ma_long, -1, 0))
         
-        return result
+        # 新列一次性加到原数据上，原有列不复制；找出交叉点
+        return df.assign(MA_Short=ma_short, MA_Long=ma_long, Signal=signal,
+                         Position=lambda d: d['Signal'].diff())
     
     def backtest(self, df: pd.DataFrame, initial_capital: float = 100000) -> Dict:
         """
@@ -61,40 +58,10 @@ class DualMovingAverageStrategy:
         """
         signals = self.generate_signals(df)
         
-        # 初始化
-        capital = initial_capital
-        shares = 0
-        trade_log = []
-        
-        for i in range(len(signals)):
-            if signals['Position'].iloc[i] == 2:  # 买入信号
-                if capital > 0:
-                    price = signals['收盘'].iloc[i]
-                    shares = capital / price
-                    capital = 0
-                    trade_log.append({
-                        'date': signals['日期'].iloc[i],
-                        'action': 'BUY',
-                        'price': price,
-                        'shares': shares
-                    })
-            
-            elif signals['Position'].iloc[i] == -2:  # 卖出信号
-                if shares > 0:
-                    price = signals['收盘'].iloc[i]
-                    capital = shares * price
-                    profit = capital - initial_capital
-                    trade_log.append({
-                        'date': signals['日期'].iloc[i],
-                        'action': 'SELL',
-                        'price': price,
-                        'shares': shares,
-                        'profit': profit
-                    })
-                    shares = 0
-        
-        # 计算最终收益
-        final_value = capital if shares == 0 else shares * signals['收盘'].iloc[-1]
+        signal = signals['Position'].to_numpy()
+        final_value, trade_log = run_backtest(signal == 2, signal == -2,
+                                              signals['收盘'].to_numpy(), signals['日期'],
+                                              initial_capital)
         total_return = (final_value - initial_capital) / initial_capital * 100
         
         return {
@@ -6,6 +6,10 @@ import pandas as pd
 import numpy as np
 from typing import Dict
 
+from src.backtest import run_backtest
+from src.ta_kernels import kdj_trade_signal
+from src.technical_analysis import TechnicalIndicators
+
 
 class KDJStrategy:
     """KDJ策略"""
@@ -42,41 +46,16 @@ class KDJStrategy:
         Returns:
             DataFrame: 添加了交易信号的数据
         """
-        result = df.copy()
-        
         # 计算KDJ
-        low_list = result['最低'].rolling(window=self.n, min_periods=1).min()
-        high_list = result['最高'].rolling(window=self.n, min_periods=1).max()
-        rsv = (result['收盘'] - low_list) / (high_list - low_list) * 100
-        
-        result['K'] = rsv.ewm(com=self.m1-1, adjust=False).mean()
-        result['D'] = result['K'].ewm(com=self.m2-1, adjust=False).mean()
-        result['J'] = 3 * result['K'] - 2 * result['D']
-        
-        # 生成交易信号
-        result['Trade_Signal'] = 0
-        
-        # 超卖区买入: J值从下方上穿超卖线
-        result.loc[(result['J'] > self.oversold) & 
-                   (result['J'].shift(1) <= self.oversold), 
-                   'Trade_Signal'] = 1
+        result = TechnicalIndicators.calculate_kdj(df, self.n, self.m1, self.m2)
         
-        # 超买区卖出: J值从上方下穿超买线
-        result.loc[(result['J'] < self.overbought) & 
-                   (result['J'].shift(1) >= self.overbought), 
-                   'Trade_Signal'] = -1
-        
-        # KDJ金叉买入
-        result.loc[(result['K'] > result['D']) & 
-                   (result['K'].shift(1) <= result['D'].shift(1)) &
-                   (result['K'] < 50), 
-                   'Trade_Signal'] = 1
-        
-        # KDJ死叉卖出
-        result.loc[(result['K'] < result['D']) & 
-                   (result['K'].shift(1) >= result['D'].shift(1)) &
-                   (result['K'] > 50), 
-                   'Trade_Signal'] = -1
+        # 生成交易信号: J 穿越超卖/超买线、K<50 金叉买入、K>50 死叉卖出
+        result['Trade_Signal'] = kdj_trade_signal(
+            result['J'].to_numpy(dtype=np.float64),
+            result['K'].to_numpy(dtype=np.float64),
+            result['D'].to_numpy(dtype=np.float64),
+            self.oversold, self.overbought
+        )
         
         return result
     
@@ -93,36 +72,10 @@ class KDJStrategy:
         """
         signals = self.generate_signals(df)
         
-        capital = initial_capital
-        shares = 0
-        trade_log = []
-        
-        for i in range(len(signals)):
-            if signals['Trade_Signal'].iloc[i] == 1 and capital > 0:
-                price = signals['收盘'].iloc[i]
-                shares = capital / price
-                capital = 0
-                trade_log.append({
-                    'date': signals['日期'].iloc[i],
-                    'action': 'BUY',
-                    'price': price,
-                    'shares': shares
-                })
-            
-            elif signals['Trade_Signal'].iloc[i] == -1 and shares > 0:
-                price = signals['收盘'].iloc[i]
-                capital = shares * price
-                profit = capital - initial_capital
-                trade_log.append({
-                    'date': signals['日期'].iloc[i],
-                    'action': 'SELL',
-                    'price': price,
-                    'shares': shares,
-                    'profit': profit
-                })
-                shares = 0
-        
-        final_value = capital if shares == 0 else shares * signals['收盘'].iloc[-1]
+        signal = signals['Trade_Signal'].to_numpy()
+        final_value, trade_log = run_backtest(signal == 1, signal == -1,
+                                              signals['收盘'].to_numpy(), signals['日期'],
+                                              initial_capital)
         total_return = (final_value - initial_capital) / initial_capital * 100
         
         return {
@@ -6,6 +6,9 @@ import pandas as pd
 import numpy as np
 from typing import Dict
 
+from src.backtest import run_backtest
+from src.ta_kernels import death_cross, golden_cross, macd_kernel
+
 
 class MACDStrategy:
     """MACD策略"""
@@ -33,30 +36,19 @@ class MACDStrategy:
         Returns:
             DataFrame: 添加了交易信号的数据
         """
-        result = df.copy()
-        
-        # 计算MACD
-        ema_fast = result['收盘'].ewm(span=self.fast, adjust=False).mean()
-        ema_slow = result['收盘'].ewm(span=self.slow, adjust=False).mean()
-        
-        result['MACD'] = ema_fast - ema_slow
-        result['Signal_Line'] = result['MACD'].ewm(span=self.signal, adjust=False).mean()
-        result['Histogram'] = result['MACD'] - result['Signal_Line']
-        
-        # 生成交易信号
-        result['Trade_Signal'] = 0
+        # 计算MACD: 快慢 EMA 和信号线在一次遍历中算出
+        _, _, macd, signal_line = macd_kernel(
+            df['收盘'].to_numpy(dtype=np.float64),
+            2.0 / (self.fast + 1), 2.0 / (self.slow + 1), 2.0 / (self.signal + 1)
+        )
         
-        # 金叉买入
-        result.loc[(result['MACD'] > result['Signal_Line']) & 
-                   (result['MACD'].shift(1) <= result['Signal_Line'].shift(1)), 
-                   'Trade_Signal'] = 1
+        # 生成交易信号: MACD 上穿信号线(金叉)买入，下穿(死叉)卖出，两者不会同一天出现
+        trade_signal = (golden_cross(macd, signal_line).astype(np.int64)
+                        - death_cross(macd, signal_line))
         
-        # 死叉卖出
-        result.loc[(result['MACD'] < result['Signal_Line']) & 
-                   (result['MACD'].shift(1) >= result['Signal_Line'].shift(1)), 
-                   'Trade_Signal'] = -1
-        
-        return result
+        # 新列一次性加到原数据上，原有列不复制
+        return df.assign(MACD=macd, Signal_Line=signal_line,
+                         Histogram=macd - signal_line, Trade_Signal=trade_signal)
     
     def backtest(self, df: pd.DataFrame, initial_capital: float = 100000) -> Dict:
         """
@@ -71,36 +63,10 @@ class MACDStrategy:
         """
         signals = self.generate_signals(df)
         
-        capital = initial_capital
-        shares = 0
-        trade_log = []
-        
-        for i in range(len(signals)):
-            if signals['Trade_Signal'].iloc[i] == 1 and capital > 0:  # 买入
-                price = signals['收盘'].iloc[i]
-                shares = capital / price
-                capital = 0
-                trade_log.append({
-                    'date': signals['日期'].iloc[i],
-                    'action': 'BUY',
-                    'price': price,
-                    'shares': shares
-                })
-            
-            elif signals['Trade_Signal'].iloc[i] == -1 and shares > 0:  # 卖出
-                price = signals['收盘'].iloc[i]
-                capital = shares * price
-                profit = capital - initial_capital
-                trade_log.append({
-                    'date': signals['日期'].iloc[i],
-                    'action': 'SELL',
-                    'price': price,
-                    'shares': shares,
-                    'profit': profit
-                })
-                shares = 0
-        
-        final_value = capital if shares == 0 else shares * signals['收盘'].iloc[-1]
+        signal = signals['Trade_Signal'].to_numpy()
+        final_value, trade_log = run_backtest(signal == 1, signal == -1,
+                                              signals['收盘'].to_numpy(), signals['日期'],
+                                              initial_capital)
         total_return = (final_value - initial_capital) / initial_capital * 100
         
         return {
@@ -17,10 +17,9 @@ from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 import time
 import logging
+from dataclasses import dataclass
 from functools import wraps
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from src.data_fetcher import StockDataFetcher
-from src.technical_analysis import TechnicalIndicators
+from src.data_fetcher import StockDataFetcher, get_stock_list_cached
 
 
 # 配置日志
@@ -30,6 +29,35 @@ logging.basicConfig(
 )
 
 
+@dataclass
+class StockBars:
+    """
+    单只股票的历史行情，按列保存为数组，条件判断时只按位置取值
+    
+    收盘价存为 float32: 价格只有两位小数，均线比较不需要更高精度，批量计算均线时内存占用减半；
+    成交量可达上亿股，保持 float64 以免整数部分丢失精度
+    """
+    close: np.ndarray
+    volume: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.close)
+
+
+def to_bars(df: pd.DataFrame) -> StockBars:
+    """
+    把历史数据 DataFrame 转为 StockBars，每个用到的列只转换一次
+    
+    Args:
+        df: 历史数据（含收盘、成交量列）
+        
+    Returns:
+        StockBars: 列式行情
+    """
+    return StockBars(close=df['收盘'].to_numpy(dtype=np.float32),
+                     volume=df['成交量'].to_numpy(dtype=np.float64))
+
+
 def retry_on_failure(max_retries: int = 3, delay: float = 0.3):
     """
     重试装饰器 - 网络请求失败时自动重试
@@ -58,6 +86,9 @@ def retry_on_failure(max_retries: int = 3, delay: float = 0.3):
 class TailMarketStrategyOptimized:
     """尾盘选股策略 - 优化版 V2"""
     
+    # 均线多头排列检查用到的均线周期，历史数据至少需要最长周期的天数
+    MA_PERIODS = (5, 10, 20, 60)
+    
     def __init__(self, max_workers: int = 10, enable_logging: bool = False):
         """
         初始化
@@ -76,12 +107,12 @@ class TailMarketStrategyOptimized:
         if not enable_logging:
             self.logger.setLevel(logging.WARNING)
     
-    def check_volume_pattern(self, df: pd.DataFrame, days: int = 5) -> Dict:
+    def check_volume_pattern(self, bars: StockBars, days: int = 5) -> Dict:
         """
         检查成交量是否呈阶梯式抬高(持续放量) - 增强版
         
         Args:
-            df: 历史数据
+            bars: 历史行情
             days: 检查的天数
             
         Returns:
@@ -89,31 +120,31 @@ class TailMarketStrategyOptimized:
         """
         result = {'passed': False, 'score': 0, 'description': ''}
         
-        if len(df) < max(days, 20):
+        if len(bars) < max(days, 20):
             result['description'] = '数据不足'
             return result
         
-        recent_volumes = df['成交量'].tail(days).values
-        avg_volume_20d = df['成交量'].tail(20).mean()  # 20日均量作为基准
-        avg_volume_5d = df['成交量'].tail(5).mean()    # 5日均量
+        volumes = bars.volume
+        recent_volumes = volumes[-days:]
         
-        # 1. 线性回归斜率检查 - 趋势判断
-        x = np.arange(len(recent_volumes))
-        slope = np.polyfit(x, recent_volumes, 1)[0]
+        # 1. 线性回归斜率检查 - 趋势判断（最先判断，未通过时不再计算其余指标）
+        # 只需斜率的正负，即中心化的 x 与成交量的内积，不必做完整的最小二乘拟合
+        x = np.arange(days) - (days - 1) / 2
+        slope = x @ recent_volumes
         
         if slope <= 0:
             result['description'] = '成交量趋势下降'
             return result
         
-        # 2. 检查放量天数和幅度
-        volume_increases = 0
-        significant_increases = 0  # 显著放量（超过前一天10%）
+        avg_volume_20d = volumes[-20:].mean()  # 20日均量作为基准
+        avg_volume_5d = volumes[-5:].mean()    # 5日均量
         
-        for i in range(1, len(recent_volumes)):
-            if recent_volumes[i] > recent_volumes[i-1]:
-                volume_increases += 1
-                if recent_volumes[i] > recent_volumes[i-1] * 1.1:
-                    significant_increases += 1
+        # 2. 检查放量天数和幅度
+        current, previous = recent_volumes[1:], recent_volumes[:-1]
+        increased = current > previous
+        volume_increases = int(increased.sum())
+        # 显著放量（超过前一天10%）
+        significant_increases = int((increased & (current > previous * 1.1)).sum())
         
         # 3. 最近一天成交量与均量比较
         latest_volume = recent_volumes[-1]
@@ -172,12 +203,12 @@ class TailMarketStrategyOptimized:
         
         return result
     
-    def check_ma_alignment(self, latest_data: pd.Series) -> Dict:
+    def check_ma_alignment(self, latest_data: Dict) -> Dict:
         """
         检查均线多头排列 - 增强版
         
         Args:
-            latest_data: 最新一天的数据
+            latest_data: 最新一天的数据（收盘价和 MA5/MA10/MA20/MA60，dict 或 Series）
             
         Returns:
             dict: {'passed': bool, 'score': int, 'type': str, 'description': str}
@@ -243,8 +274,8 @@ class TailMarketStrategyOptimized:
         
         return result
     
-    def calculate_volume_ratio(self, df: pd.DataFrame, symbol: str = None, 
-                               stock_row: pd.Series = None) -> Dict:
+    def calculate_volume_ratio(self, bars: StockBars, symbol: str = None, 
+                               stock_row: Optional[Dict] = None) -> Dict:
         """
         计算量比 - 优化版
         量比 = 当日成交量 / 最近5日平均成交量
@@ -252,7 +283,7 @@ class TailMarketStrategyOptimized:
         优先使用 stock_row 中的数据，避免额外网络请求
         
         Args:
-            df: 历史数据
+            bars: 历史行情
             symbol: 股票代码
             stock_row: 股票列表中的行数据（包含实时成交量）
             
@@ -261,7 +292,7 @@ class TailMarketStrategyOptimized:
         """
         result = {'ratio': 0, 'score': 0, 'description': ''}
         
-        if len(df) < 6:
+        if len(bars) < 6:
             result['description'] = '历史数据不足'
             return result
         
@@ -272,11 +303,12 @@ class TailMarketStrategyOptimized:
             current_volume = stock_row['成交量']
         
         # 如果 stock_row 没有数据，使用历史数据的最后一天
+        volumes = bars.volume
         if current_volume is None or current_volume == 0:
-            current_volume = df['成交量'].iloc[-1]
+            current_volume = volumes[-1]
         
         # 计算最近5日平均成交量（不包括今天）
-        avg_volume_5d = df['成交量'].iloc[-6:-1].mean()
+        avg_volume_5d = volumes[-6:-1].mean()
         
         if avg_volume_5d == 0:
             result['description'] = '5日均量为0'
@@ -317,7 +349,7 @@ class TailMarketStrategyOptimized:
         
         return result
     
-    def check_intraday_strength(self, symbol: str, stock_row: pd.Series) -> Dict:
+    def check_intraday_strength(self, symbol: str, stock_row: Dict) -> Dict:
         """
         检查分时图强度 - 增强版
         从stock_list中获取数据，避免额外网络请求
@@ -437,7 +469,7 @@ class TailMarketStrategyOptimized:
             }
             
         except Exception as e:
-            self.logger.debug(f"分析 {symbol} 分时强度失败: {e}")
+            self.logger.debug("分析 %s 分时强度失败: %s", symbol, e)
             return {'strength': 0, 'description': f'分析失败', 'price_position': 0}
     
     @retry_on_failure(max_retries=3, delay=0.3)
@@ -449,7 +481,7 @@ class TailMarketStrategyOptimized:
             end_date=end_date
         )
     
-    def analyze_single_stock(self, symbol: str, name: str, stock_row: pd.Series, 
+    def analyze_single_stock(self, symbol: str, name: str, stock_row: Dict, 
                             min_volume_ratio: float, start_date: str, end_date: str) -> Optional[Dict]:
         """
         分析单只股票 - 用于并行处理（增强版）
@@ -471,35 +503,84 @@ class TailMarketStrategyOptimized:
         Returns:
             dict: 符合条件的股票信息，或None
         """
-        try:
-            # 获取历史数据（带重试）
-            df = self._fetch_stock_hist(symbol, start_date, end_date)
+        # 获取历史数据（带重试）
+        df = self._fetch_stock_hist(symbol, start_date, end_date)
+        # 获取失败时 df 为 None 或不含任何列的空 DataFrame，按数据不足处理
+        bars = to_bars(df) if df is not None and not df.empty else None
+        return self.analyze_stock_history(symbol, name, stock_row, bars, min_volume_ratio)
+    
+    def latest_ma_values(self, histories: Dict[str, StockBars]) -> Dict[str, Dict]:
+        """
+        批量计算各股票最新一天的收盘价和 MA_PERIODS 各周期均线
+        
+        只用到最新一天的均线，即最近N天收盘价的平均值: 各股票最近 max(MA_PERIODS) 天的
+        收盘价堆成一个矩阵，每个周期对最后N列按行求平均，所有股票一次算出
+        
+        Args:
+            histories: {股票代码: 历史行情}
             
-            if df is None or df.empty or len(df) < 60:
-                self.logger.debug(f"{symbol} {name}: 历史数据不足")
-                return None
+        Returns:
+            dict: {股票代码: {'收盘': 收盘价, 'MA5': ..., ...}}，数据不足的股票不包含在内
+        """
+        window = max(self.MA_PERIODS)
+        symbols = [symbol for symbol, bars in histories.items()
+                   if bars is not None and len(bars) >= window]
+        if not symbols:
+            return {}
+        
+        closes = np.stack([histories[symbol].close[-window:] for symbol in symbols])
+        # 按 float64 累加，矩阵保持 float32
+        mas = {f'MA{period}': closes[:, -period:].mean(axis=1, dtype=np.float64)
+               for period in self.MA_PERIODS}
+        
+        latest = {}
+        for i, symbol in enumerate(symbols):
+            values = {name: ma[i] for name, ma in mas.items()}
+            values['收盘'] = float(closes[i, -1])
+            latest[symbol] = values
+        return latest
+    
+    def analyze_stock_history(self, symbol: str, name: str, stock_row: Dict,
+                              bars: Optional[StockBars], min_volume_ratio: float,
+                              latest: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        用已获取的历史数据分析单只股票，只做计算不发网络请求（评分规则见 analyze_single_stock）
+        
+        Args:
+            symbol: 股票代码
+            name: 股票名称
+            stock_row: 股票列表中的行数据
+            bars: 历史行情
+            min_volume_ratio: 最小量比
+            latest: latest_ma_values 批量算出的该股票最新收盘价和均线，为 None 时单独计算
             
-            # 计算技术指标
-            df = TechnicalIndicators.calculate_ma(df, periods=[5, 10, 20, 60])
+        Returns:
+            dict: 符合条件的股票信息，或None
+        """
+        try:
+            if bars is None or len(bars) < max(self.MA_PERIODS):
+                self.logger.debug("%s %s: 历史数据不足", symbol, name)
+                return None
             
-            latest = df.iloc[-1]
+            if latest is None:
+                latest = self.latest_ma_values({symbol: bars})[symbol]
             
             # 检查均线多头排列（增强版）
             ma_result = self.check_ma_alignment(latest)
             if not ma_result['passed']:
-                self.logger.debug(f"{symbol} {name}: {ma_result['description']}")
+                self.logger.debug("%s %s: %s", symbol, name, ma_result['description'])
                 return None
             
             # 计算量比（优化版，使用stock_row数据）
-            volume_result = self.calculate_volume_ratio(df, symbol=symbol, stock_row=stock_row)
+            volume_result = self.calculate_volume_ratio(bars, symbol=symbol, stock_row=stock_row)
             if volume_result['ratio'] < min_volume_ratio:
-                self.logger.debug(f"{symbol} {name}: 量比{volume_result['ratio']:.2f}不足")
+                self.logger.debug("%s %s: 量比%.2f不足", symbol, name, volume_result['ratio'])
                 return None
             
             # 检查成交量阶梯式放量（增强版）
-            volume_pattern = self.check_volume_pattern(df, days=5)
+            volume_pattern = self.check_volume_pattern(bars, days=5)
             if not volume_pattern['passed']:
-                self.logger.debug(f"{symbol} {name}: {volume_pattern['description']}")
+                self.logger.debug("%s %s: %s", symbol, name, volume_pattern['description'])
                 return None
             
             # 检查分时强度（增强版）
@@ -561,7 +642,7 @@ class TailMarketStrategyOptimized:
             }
             
         except Exception as e:
-            self.logger.debug(f"分析 {symbol} {name} 失败: {e}")
+            self.logger.debug("分析 %s %s 失败: %s", symbol, name, e)
             return None
     
     def screen_tail_market_stocks(self,
@@ -597,7 +678,9 @@ class TailMarketStrategyOptimized:
         
         # 获取股票列表
         print("\n正在获取股票列表...")
-        stock_list = self.fetcher.get_stock_list()
+        # 进程内共享的列表缓存，同一进程先后运行多个选股策略时不重复拉取全市场列表；
+        # 有效期与 fetcher 的内存缓存一致，盘中不会用到过旧的涨跌幅
+        stock_list = get_stock_list_cached()
         self.stock_list_cache = stock_list  # 缓存
         
         if stock_list.empty:
@@ -608,47 +691,47 @@ class TailMarketStrategyOptimized:
         
         # 第一步: 基础筛选
         print("\n第一步: 基础条件筛选...")
-        filtered = stock_list.copy()
+        # 代码前缀和名称条件在 NumPy 定长字符串数组上累积为一个掩码，不逐步复制 DataFrame
+        codes = stock_list['代码'].to_numpy(dtype=str)
+        names = stock_list['名称'].fillna('').to_numpy(dtype=str)
+        mask = np.ones(len(stock_list), dtype=bool)
         
         # 排除科创板
-        filtered = filtered[~filtered['代码'].str.startswith('688')]
-        print(f"  排除科创板: {len(filtered)} 只")
+        mask &= ~np.char.startswith(codes, '688')
+        print(f"  排除科创板: {mask.sum()} 只")
         
         # 可选排除创业板
         if exclude_cyb:
-            filtered = filtered[~filtered['代码'].str.startswith('300')]
-            print(f"  排除创业板: {len(filtered)} 只")
+            mask &= ~np.char.startswith(codes, '300')
+            print(f"  排除创业板: {mask.sum()} 只")
         
         # 排除ST
-        filtered = filtered[~filtered['名称'].str.contains('ST', na=False)]
-        print(f"  排除ST: {len(filtered)} 只")
+        mask &= np.char.find(names, 'ST') < 0
+        print(f"  排除ST: {mask.sum()} 只")
         
         # 排除北交所
-        filtered = filtered[~filtered['代码'].str.startswith('8')]
-        filtered = filtered[~filtered['代码'].str.startswith('4')]
-        print(f"  排除北交所: {len(filtered)} 只")
+        mask &= ~(np.char.startswith(codes, '8') | np.char.startswith(codes, '4'))
+        print(f"  排除北交所: {mask.sum()} 只")
+        
+        # 数值区间条件继续累积到同一个掩码，最后只索引一次 DataFrame
+        change = stock_list['涨跌幅'].to_numpy(dtype=np.float64)
+        turnover = stock_list['换手率'].to_numpy(dtype=np.float64)
+        # 市值筛选优先使用流通市值
+        market_cap_col = '流通市值' if '流通市值' in stock_list.columns else '总市值'
+        market_cap = stock_list[market_cap_col].to_numpy(dtype=np.float64)
         
         # 涨幅筛选
-        filtered = filtered[
-            (filtered['涨跌幅'] >= min_change) & 
-            (filtered['涨跌幅'] <= max_change)
-        ]
-        print(f"  涨幅{min_change}%-{max_change}%: {len(filtered)} 只")
+        mask &= (change >= min_change) & (change <= max_change)
+        print(f"  涨幅{min_change}%-{max_change}%: {mask.sum()} 只")
         
         # 换手率筛选
-        filtered = filtered[
-            (filtered['换手率'] >= min_turnover) & 
-            (filtered['换手率'] <= max_turnover)
-        ]
-        print(f"  换手率{min_turnover}%-{max_turnover}%: {len(filtered)} 只")
-        
-        # 市值筛选（优先使用流通市值）
-        market_cap_col = '流通市值' if '流通市值' in filtered.columns else '总市值'
-        filtered = filtered[
-            (filtered[market_cap_col] >= min_market_cap * 1e8) & 
-            (filtered[market_cap_col] <= max_market_cap * 1e8)
-        ]
-        print(f"  市值{min_market_cap}-{max_market_cap}亿: {len(filtered)} 只")
+        mask &= (turnover >= min_turnover) & (turnover <= max_turnover)
+        print(f"  换手率{min_turnover}%-{max_turnover}%: {mask.sum()} 只")
+        
+        # 市值筛选
+        mask &= (market_cap >= min_market_cap * 1e8) & (market_cap <= max_market_cap * 1e8)
+        print(f"  市值{min_market_cap}-{max_market_cap}亿: {mask.sum()} 只")
+        filtered = stock_list[mask]
         
         if filtered.empty:
             print("\n没有股票通过基础筛选")
@@ -669,50 +752,47 @@ class TailMarketStrategyOptimized:
         end_date = datetime.now().strftime("%Y%m%d")
         start_date = (datetime.now() - timedelta(days=120)).strftime("%Y%m%d")  # 增加到120天确保MA60有效
         
-        # 准备任务列表
-        tasks = []
-        for idx, (_, row) in enumerate(filtered.iterrows()):
-            symbol = row['代码']
-            name = row['名称']
-            tasks.append((idx, symbol, name, row))
+        # 行数据转为字典，避免 iterrows 为每行构造 Series
+        rows = {row['代码']: row for row in filtered.to_dict('records')}
+        total = len(rows)
         
-        # 并行处理
+        # 历史数据由 fetcher 在后台并发获取（共用限速器，磁盘缓存命中的直接返回），
+        # 主线程按完成顺序接收并显示进度
         completed = 0
         failed = 0
         start_time = time.time()
-        
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 提交所有任务
-            future_to_task = {
-                executor.submit(
-                    self.analyze_single_stock,
-                    symbol, name, row, min_volume_ratio, start_date, end_date
-                ): (idx, symbol, name) 
-                for idx, symbol, name, row in tasks
-            }
-            
-            # 收集结果
-            for future in as_completed(future_to_task):
-                completed += 1
-                idx, symbol, name = future_to_task[future]
-                
-                # 显示进度
-                if completed % 10 == 0 or completed == len(tasks):
-                    elapsed = time.time() - start_time
-                    speed = completed / elapsed if elapsed > 0 else 0
-                    remaining = (len(tasks) - completed) / speed if speed > 0 else 0
-                    print(f"  进度: {completed}/{len(tasks)} ({completed/len(tasks)*100:.1f}%) "
-                          f"速度: {speed:.1f}只/秒 预计剩余: {remaining:.0f}秒", end='\r')
-                
-                try:
-                    result = future.result()
-                    if result:
-                        qualified_stocks.append(result)
-                        print(f"\n  [{completed}/{len(tasks)}] ✓ {symbol} {name} "
-                              f"评分{result['综合评分']} 均线:{result['均线形态']}")
-                except Exception as e:
-                    failed += 1
-                    self.logger.debug(f"处理 {symbol} 失败: {e}")
+        histories = {}
+        
+        for symbol, df in self.fetcher.iter_stock_hist(list(rows), start_date, end_date,
+                                                       max_workers=self.max_workers):
+            completed += 1
+            
+            # 显示进度
+            if completed % 10 == 0 or completed == total:
+                elapsed = time.time() - start_time
+                speed = completed / elapsed if elapsed > 0 else 0
+                remaining = (total - completed) / speed if speed > 0 else 0
+                print(f"  进度: {completed}/{total} ({completed/total*100:.1f}%) "
+                      f"速度: {speed:.1f}只/秒 预计剩余: {remaining:.0f}秒", end='\r')
+            
+            if df.empty:
+                failed += 1
+                self.logger.debug("获取 %s 历史数据失败", symbol)
+                continue
+            # 只在这里转换一次，后续分析都在数组上进行
+            histories[symbol] = to_bars(df)
+        
+        # 所有股票的最新均线一次算出，逐只分析时只做条件判断
+        latest_values = self.latest_ma_values(histories)
+        for symbol, bars in histories.items():
+            row = rows[symbol]
+            name = row['名称']
+            result = self.analyze_stock_history(symbol, name, row, bars, min_volume_ratio,
+                                                latest=latest_values.get(symbol))
+            if result:
+                qualified_stocks.append(result)
+                print(f"\n  ✓ {symbol} {name} "
+                      f"评分{result['综合评分']} 均线:{result['均线形态']}")
         
         elapsed_total = time.time() - start_time
         print(f"\n  完成! 耗时{elapsed_total:.1f}秒, 分析{completed}只, "
@@ -789,8 +869,9 @@ class TailMarketStrategyOptimized:
         if len(display_df) <= 10:
             print("\n特征详情:")
             print("-" * 100)
-            for _, row in display_df.iterrows():
-                print(f"  {row['代码']} {row['名称']}: {row.get('特征', '-')}")
+            features = display_df['特征'] if '特征' in display_df.columns else ['-'] * len(display_df)
+            for code, name, feature in zip(display_df['代码'], display_df['名称'], features):
+                print(f"  {code} {name}: {feature}")
             print("-" * 100)
     
     def save_results(self, filename: str = None):
@@ -874,31 +955,11 @@ def run_tail_market_screener_old_optimized(
 
 
 if __name__ == "__main__":
-    import argparse
-    
-    parser = argparse.ArgumentParser(description='尾盘选股策略 - 优化版 V2')
-    parser.add_argument('--workers', type=int, default=10, 
-                       help='并行线程数 (默认10，建议5-15)')
-    parser.add_argument('--min-change', type=float, default=1.3,
-                       help='最小涨幅%% (默认1.3)')
-    parser.add_argument('--max-change', type=float, default=5.0,
-                       help='最大涨幅%% (默认5.0)')
-    parser.add_argument('--min-volume-ratio', type=float, default=1.0,
-                       help='最小量比 (默认1.0)')
-    parser.add_argument('--min-turnover', type=float, default=5.0,
-                       help='最小换手率%% (默认5.0)')
-    parser.add_argument('--max-turnover', type=float, default=10.0,
-                       help='最大换手率%% (默认10.0)')
-    parser.add_argument('--min-cap', type=float, default=50,
-                       help='最小市值(亿) (默认50)')
-    parser.add_argument('--max-cap', type=float, default=200,
-                       help='最大市值(亿) (默认200)')
-    parser.add_argument('--exclude-cyb', action='store_true',
-                       help='排除创业板')
-    parser.add_argument('--debug', action='store_true',
-                       help='启用调试日志')
+    from src.cli_args import make_tail_parser
+    from src.log_config import setup_logging
     
-    args = parser.parse_args()
+    args = make_tail_parser('尾盘选股策略 - 优化版 V2').parse_args()
+    setup_logging(args.verbose)
     
     run_tail_market_screener_old_optimized(
         max_workers=args.workers,